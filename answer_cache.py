@@ -0,0 +1,113 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Numbers and quoted text barely move a question's embedding but change what is asked
+# ("what's in question 3" vs "question 4"), so they have to match exactly
+_EXACT_TERMS = re.compile(r'\d+(?:[.,]\d+)*|"[^"]*"|\u201c[^\u201d]*\u201d|`[^`]*`')
+
+
+def exact_terms(question):
+    return sorted(term.lower() for term in _EXACT_TERMS.findall(question))
+
+
+class SemanticAnswerCache:
+    """Answers to earlier questions, looked up by cosine similarity of the question embedding.
+
+    Entries are scoped to a collection and the index version they were answered from: once the
+    documents change, the next lookup for that collection drops everything cached for the old
+    version. A cached question only matches if it also has the same numbers and quoted text,
+    see ``exact_terms``. Least recently used answers are evicted past ``max_entries`` or
+    ``max_bytes``.
+    """
+
+    def __init__(self, threshold=0.92, max_entries=2000, max_bytes=64 * 1024 * 1024):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._next_id = 0
+        # entry id -> entry, in least to most recently used order
+        self._entries = OrderedDict()
+        # scope -> {"version", "ids", "matrix"}, the matrix is rebuilt lazily after changes
+        self._scopes = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, scope, version, question, embedding):
+        """Return ``(answer, similarity)`` for the closest matching cached question, or ``None``."""
+        terms = exact_terms(question)
+        with self._lock:
+            index = self._scope(scope, version)
+            if not index["ids"]:
+                self.misses += 1
+                return None
+            if index["matrix"] is None:
+                index["matrix"] = np.stack([self._entries[i]["vector"] for i in index["ids"]])
+            scores = index["matrix"] @ _normalize(embedding)
+            candidates = np.flatnonzero(scores >= self.threshold)
+            for best in candidates[np.argsort(-scores[candidates])]:
+                entry_id = index["ids"][best]
+                if self._entries[entry_id]["terms"] != terms:
+                    continue
+                self._entries.move_to_end(entry_id)
+                self._entries[entry_id]["last_used"] = time.time()
+                self.hits += 1
+                return self._entries[entry_id]["answer"], float(scores[best])
+            self.misses += 1
+            return None
+
+    def store(self, scope, version, question, embedding, answer):
+        with self._lock:
+            index = self._scope(scope, version)
+            vector = _normalize(embedding)
+            entry_id = self._next_id
+            self._next_id += 1
+            size = vector.nbytes + len(question.encode("utf-8")) + len(answer.encode("utf-8"))
+            self._entries[entry_id] = {"scope": scope, "question": question, "terms": exact_terms(question), "answer": answer,
+                                       "vector": vector, "bytes": size, "last_used": time.time()}
+            self._bytes += size
+            index["ids"].append(entry_id)
+            index["matrix"] = None
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def _scope(self, scope, version):
+        index = self._scopes.get(scope)
+        if index is not None and index["version"] != version:
+            # The documents changed, answers from the old version may be wrong now
+            for entry_id in list(index["ids"]):
+                self._remove(entry_id)
+            index = None
+        if index is None:
+            index = self._scopes[scope] = {"version": version, "ids": [], "matrix": None}
+        return index
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        self._bytes -= entry["bytes"]
+        index = self._scopes[entry["scope"]]
+        index["ids"].remove(entry_id)
+        index["matrix"] = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+def _normalize(embedding):
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -3,17 +3,34 @@ from PyPDF2 import PdfReader
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 import os
+import subprocess
+import sys
+import uuid
 
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 import google.generativeai as genai
 
-from langchain_community.vectorstores import FAISS
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains.question_answering import load_qa_chain
 from langchain.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
 
-from youtube_transcript_api import YouTubeTranscriptApi
+from answer_cache import SemanticAnswerCache
+from embedding_cache import EmbeddingCache
+from index_backend import load_store
+from index_manager import IndexManager
+from index_registry import IndexRegistry
+from ingest import document_hash
+from jobs import JobQueue
+from prompts import SUBJECTS, get_subject_prompt
+from retrieval import Retriever
+from services import (CHUNK_OVERLAP, CHUNK_SIZE, EMBEDDING_CACHE_PATH, INDEX_CONFIG, INDEX_ROOT, JOBS_PATH,
+                      SUMMARY_CACHE_PATH, SUMMARY_MODEL, UPLOADS_ROOT, fetch_transcript, list_collections,
+                      make_document_embeddings, make_ingest_pipeline, make_summarizer, video_id_from_url)
+from streaming import RequestTimer, timed_stream
+from summarizer import estimate_tokens
+from telemetry import Telemetry
+from transcript_cache import TranscriptCache
+from worker import submit_ingest, submit_summary
 
 load_dotenv()
 
@@ -89,30 +106,195 @@ def home_page():
     st.markdown("<p class='centered'>Start optimizing your study sessions today!</p>", unsafe_allow_html=True)
     
 
+# Per-stage spans and counters go to telemetry/traces.jsonl and telemetry/metrics.prom,
+# set METRICS_PORT to also serve the Prometheus metrics over http at /metrics
+@st.cache_resource
+def get_telemetry():
+    telemetry = Telemetry("telemetry")
+    if os.getenv("METRICS_PORT"):
+        telemetry.serve(int(os.getenv("METRICS_PORT")))
+    return telemetry
+
+# Optional sidebar panel with the stage breakdown of the latest request on this page
+def latency_panel(request):
+    if not st.toggle("Show latency breakdown", key=f"latency-{request}"):
+        return
+    traces = get_telemetry().recent(request)
+    if not traces:
+        st.caption("No requests yet")
+        return
+    trace = traces[-1]
+    st.caption(f"Last {request} request: {trace.seconds:.2f}s")
+    st.table({"stage": [span["name"] for span in trace.spans], "seconds": [round(span["seconds"], 3) for span in trace.spans]})
+    if trace.counters:
+        st.json(trace.counters, expanded=False)
+
+
+# Embedding, chunking, index and summary settings live in services.py, shared with the background worker
+
+# One cache per process, shared by every session so repeated uploads skip the embedding API
+@st.cache_resource
+def get_embedding_cache():
+    return EmbeddingCache(EMBEDDING_CACHE_PATH)
+
+# Shared by ingest and questions, queries pass straight through the cache to the API client
+@st.cache_resource
+def get_document_embeddings():
+    return make_document_embeddings(get_embedding_cache())
+
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_TOKEN_BUDGET", "3000"))
+RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", "20"))
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "8"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+
+# Repeated and near-duplicate questions about the same documents reuse the earlier answer
+@st.cache_resource
+def get_answer_cache():
+    return SemanticAnswerCache(threshold=ANSWER_CACHE_THRESHOLD)
+
+# Loaded indexes stay resident across questions and sessions until evicted or a new version is saved
+@st.cache_resource
+def get_index_registry():
+    embeddings = get_document_embeddings()
+    # Indexes are memory-mapped and documents read from sqlite on demand, nothing is unpickled
+    return IndexRegistry(lambda folder: load_store(folder, embeddings, INDEX_CONFIG, mmap=True))
+
+INDEX_MANAGER_CACHE_ENTRIES = int(os.getenv("INDEX_MANAGER_CACHE_ENTRIES", "8"))
+
+# Uploads append to the existing index instead of rebuilding it, see IndexManager. Each manager keeps its
+# collection's index in memory for the next upload, so only the most recent few are kept around;
+# an evicted one reads its index from disk again on the next upload
+@st.cache_resource(max_entries=INDEX_MANAGER_CACHE_ENTRIES, ttl=30 * 60)
+def get_index_manager(folder):
+    return IndexManager(folder, get_document_embeddings(), registry=get_index_registry(), index_config=INDEX_CONFIG)
+
+# Every browser session gets its own collection so concurrent users don't overwrite or read each other's index,
+# shared collections built with worker.py can be picked from the sidebar instead
+def get_collection_folder():
+    if "own_collection" not in st.session_state:
+        st.session_state["own_collection"] = uuid.uuid4().hex[:12]
+    if "collection" not in st.session_state:
+        st.session_state["collection"] = st.session_state["own_collection"]
+    return os.path.join(INDEX_ROOT, st.session_state["collection"])
+
+
+# Long ingests and summaries run as jobs in worker.py, the pages only submit them and show their status
+@st.cache_resource
+def get_job_queue():
+    return JobQueue(JOBS_PATH)
+
+# Holds the worker this app started, so a second click doesn't start another before the first has registered
+@st.cache_resource
+def get_worker_process():
+    return {"process": None}
+
+def ensure_worker():
+    # Start a worker in the background unless one is already running (started here or by hand)
+    spawned = get_worker_process()
+    if spawned["process"] is not None and spawned["process"].poll() is None:
+        return
+    if get_job_queue().active_workers():
+        return
+    worker_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.py")
+    spawned["process"] = subprocess.Popen([sys.executable, worker_script, "--jobs", JOBS_PATH, "work", "--exit-when-idle", "60"])
+
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+
+def poll_while_active(render, active, *args):
+    # Reruns just this part of the page every JOB_POLL_SECONDS while a job is queued or running
+    st.fragment(run_every=JOB_POLL_SECONDS if active else None)(render)(*args)
+
+# Sidebar list of this page's recent background jobs, updated on its own while any of them is still going
+def jobs_panel(kind):
+    jobs = get_job_queue().recent(kind, limit=5)
+    poll_while_active(job_list, any(job["status"] in ("queued", "running") for job in jobs), kind)
+
+def job_list(kind):
+    jobs = get_job_queue().recent(kind, limit=5)
+    if not jobs:
+        return
+    st.subheader("Background jobs")
+    for job in jobs:
+        payload = job["payload"]
+        target = payload.get("collection") or payload.get("video_id")
+        progress = job["progress"] or {}
+        if job["status"] == "running" and kind == "ingest" and progress.get("files"):
+            st.progress(progress["files_done"] / progress["files"], text=f"#{job['id']} {target}: {progress['files_done']}/{progress['files']} PDFs")
+        elif job["status"] == "running":
+            st.caption(f"#{job['id']} {target}: {progress.get('stage', 'running')}")
+        elif job["status"] == "failed":
+            st.caption(f"#{job['id']} {target}: failed, {job['error']}")
+        else:
+            st.caption(f"#{job['id']} {target}: {job['status']}")
+    # Once a job finishes the whole page reruns, so the indexed PDFs and notes it produced show up
+    active = {job["id"] for job in jobs if job["status"] in ("queued", "running")}
+    finished = st.session_state.get(f"active-jobs-{kind}", set()) - active
+    st.session_state[f"active-jobs-{kind}"] = active
+    if finished:
+        st.rerun()
+
+
 # --- Pdf Chat Page ---
 def assignment_chat_page():
 
     def get_pdf_text(pdf_docs):
-        text=""
+        pages=[]
         for pdf in pdf_docs:
             pdf_reader = PdfReader(pdf)
             for page in pdf_reader.pages:
-                text += page.extract_text()
-        return text
+                pages.append(page.extract_text())
+        return "".join(pages)
 
-    #We will divide the text into smaller chunks for vectorization (10000 tokens or words)
+    #We will divide the text into smaller chunks for vectorization (CHUNK_SIZE characters)
     def get_text_chunks(text):
-        text_splitter=RecursiveCharacterTextSplitter(chunk_size=10000, chunk_overlap=1000)
+        text_splitter=RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
         chunks=text_splitter.split_text(text)
         return chunks
 
-    def get_vector_store(text_chunks):
-        embeddings=GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-        vector_store=FAISS.from_texts(text_chunks,embedding=embeddings)
-        vector_store.save_local("faiss_index")
+    def get_vector_store(text_chunks, pdf):
+        # Appends this pdf's chunks to the index (replacing an older upload with the same name)
+        return get_index_manager(get_collection_folder()).add_texts(pdf.name, document_hash(pdf.getvalue()), text_chunks)
+
+    # Pipelined version of get_pdf_text -> get_text_chunks -> get_vector_store with per-stage progress
+    def ingest_pdfs_pipelined(pdf_docs, trace):
+        pipeline=make_ingest_pipeline(get_document_embeddings())
+        extract_bar=st.progress(0.0, text="Extracting pages")
+        split_status=st.empty()
+        embed_bar=st.progress(0.0, text="Embedding chunks")
+
+        def on_progress(stats):
+            if stats.total_pages:
+                extract_bar.progress(min(stats.pages / stats.total_pages, 1.0), text=f"Extracted {stats.pages}/{stats.total_pages} pages")
+            split_status.caption(f"Split {stats.chunks} chunks")
+            if stats.chunks:
+                embed_bar.progress(min(stats.embedded / stats.chunks, 1.0), text=f"Embedded {stats.embedded}/{stats.chunks} chunks")
+
+        indexed=get_index_manager(get_collection_folder()).add_documents([(pdf.name, pdf.getvalue()) for pdf in pdf_docs], pipeline, on_progress=on_progress)
+        stats=pipeline.stats
+        if stats.empty_documents:
+            st.warning(f"No text found in {', '.join(stats.empty_documents)}, scanned PDFs can't be indexed")
+        for stage in ("extract", "split", "embed", "index"):
+            trace.add_span(stage, getattr(stats, f"{stage}_seconds"))
+        trace.count("bytes", stats.bytes)
+        trace.count("pages", stats.pages)
+        trace.count("chunks", stats.chunks)
+        return indexed
+
+    # Uploads are spooled to disk and indexed by the background worker, which keeps going if the user navigates away
+    def queue_pdfs(pdf_docs):
+        upload_folder=os.path.join(UPLOADS_ROOT, uuid.uuid4().hex)
+        os.makedirs(upload_folder)
+        for pdf in pdf_docs:
+            with open(os.path.join(upload_folder, os.path.basename(pdf.name)), "wb") as f:
+                f.write(pdf.getvalue())
+        job_id=submit_ingest(get_job_queue(), st.session_state["collection"], [os.path.abspath(upload_folder)], cleanup=True)
+        ensure_worker()
+        return job_id
 
     # we store this vector_store in a db but I'll use local env as faiss index folder
 
+    # Built once per process, the model client and chain are reused across questions
+    @st.cache_resource
     def get_conversational_chain():
         prompt_template="""Answer the question as detailed as possible from the provided context, make sure to provide all the details, if the answer is not in provided context just say, "answer is not available in the pdf provided", don't provide the wrong answer\n\n
         Context:\n {context}?\n
@@ -123,23 +305,67 @@ def assignment_chat_page():
         model=ChatGoogleGenerativeAI(model="gemini-pro",temperature=0.3)
 
         prompt=PromptTemplate(template=prompt_template, input_variables=["context","question"])
-        chain=load_qa_chain(model,chain_type="stuff",prompt=prompt)
+        # Same "stuff" prompt as before, built as a runnable so the answer can be streamed token by token
+        chain=prompt | model | StrOutputParser()
         return chain
 
 
-    def user_input(user_question):
-        embeddings=GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-        # Loading out chunks in local env stored in faiss_index folder
-        new_db = FAISS.load_local("faiss_index",embeddings,allow_dangerous_deserialization=True)
-        # Performing similarity search to search for content that is similar to the user question
-        docs = new_db.similarity_search(user_question)
-
-        # initializing Convo chain for QnA
-        chain=get_conversational_chain()
-        response = chain({"input_documents":docs, "question":user_question}, return_only_outputs=True)
+    def legacy_warning(names):
+        st.warning(f"{', '.join(names)} were indexed by an older version, upload them again to ask about them")
 
-        print(response)
-        st.write("Reply: ", response["output_text"])
+    def user_input(user_question):
+        with get_telemetry().trace("chat") as trace:
+            timer=RequestTimer("chat")
+            index_manager=get_index_manager(get_collection_folder())
+            # The worker may have saved a new version since the last question
+            index_manager.refresh()
+            if not index_manager.documents:
+                if index_manager.legacy_documents:
+                    legacy_warning(index_manager.legacy_documents)
+                else:
+                    st.warning("Upload and process some PDFs first")
+                return
+            # Our chunks stay loaded in the registry, it only goes to disk when the index version changed
+            with trace.span("index_load"):
+                new_db = get_index_registry().get(index_manager.folder, index_manager.version)
+            if new_db is None:
+                legacy_warning(sorted(doc["name"] for doc in index_manager.documents.values()))
+                return
+            with trace.span("embed_query"):
+                question_embedding=new_db.embedding_function.embed_query(user_question)
+            with trace.span("answer_cache"):
+                cached=get_answer_cache().lookup(index_manager.folder, index_manager.version, user_question, question_embedding)
+            if cached is not None:
+                answer, similarity=cached
+                trace.count("answer_cache_hits")
+                st.write("Reply: ", answer)
+                st.caption(f"Answered from cache (question similarity {similarity:.2f})")
+                return
+
+            # Searching for content relevant to the user question, packed into the context token budget
+            retriever=Retriever(token_budget=RETRIEVAL_TOKEN_BUDGET, fetch_k=RETRIEVAL_FETCH_K, k=RETRIEVAL_K)
+            docs = retriever.retrieve(new_db, user_question, embedding=question_embedding)
+            report=retriever.last_report
+            trace.add_span("faiss_search", report["search_seconds"])
+
+            # initializing Convo chain for QnA
+            chain=get_conversational_chain()
+            context="\n\n".join(doc.page_content for doc in docs)
+            prompt_tokens=estimate_tokens(chain.first.format(context=context, question=user_question))
+            trace.count("context_chunks", len(docs))
+            trace.count("prompt_tokens", prompt_tokens)
+
+            st.write("Reply: ")
+            with trace.span("llm"):
+                answer=st.write_stream(timed_stream(chain.stream({"context":context, "question":user_question}), timer))
+            if timer.ttft is not None:
+                trace.add_span("time_to_first_token", timer.ttft)
+            if isinstance(answer, str) and answer:
+                trace.count("answer_tokens", estimate_tokens(answer))
+                get_answer_cache().store(index_manager.folder, index_manager.version, user_question, question_embedding, answer)
+            st.caption(f"First token after {timer.ttft or 0:.2f}s, full answer in {timer.total:.2f}s · "
+                       f"retrieval {report['retrieval_seconds'] * 1000:.0f} ms, {report['selected']}/{report['candidates']} chunks, "
+                       f"prompt ~{prompt_tokens} tokens (context budget {report['token_budget']})")
 
 
     st.header("Chat With Pdfs 🗣️")
@@ -151,175 +377,123 @@ def assignment_chat_page():
     
     with st.sidebar:
         st.title("Menu:")
+        get_collection_folder()
+        # Only this session's collection and the shared ones, other sessions' collections stay private
+        collections=[st.session_state["own_collection"]] + [name for name in list_collections() if name != st.session_state["own_collection"]]
+        if st.session_state["collection"] not in collections:
+            st.session_state["collection"]=st.session_state["own_collection"]
+        st.session_state["collection"]=st.selectbox("Collection", collections, index=collections.index(st.session_state["collection"]),
+                                                    help="Collections indexed with worker.py show up here too")
         pdf_docs=st.file_uploader("Upload the PDF Files and Click on the Submit Button",accept_multiple_files=True)
-        if st.button("Submit & Process"):
-            with st.spinner("Processing....."):
-                # calling text fn to get text data from pdf
-                raw_text=get_pdf_text(pdf_docs)
-                # Converting that text into chunks (vectorization using Faiss)
-                text_chunks=get_text_chunks(raw_text)
-                # Storing them chunks in local
-                get_vector_store(text_chunks)
-                st.success("Done",icon="✅")
+        # Uploads are indexed by the background worker unless asked to run here, which blocks the page until done
+        background=st.toggle("Process in background", value=True, help="Index the PDFs in a background worker, this page only shows the job's progress")
+        pipelined=st.toggle("Pipelined ingest", value=True, disabled=background, help="Extract, split and embed in parallel stages with bounded memory")
+        submitted=st.button("Submit & Process")
+        if submitted and background:
+            if pdf_docs:
+                st.info(f"Queued background job #{queue_pdfs(pdf_docs)}")
+        elif submitted and pdf_docs:
+            cache_before=get_embedding_cache().stats()
+            with get_telemetry().trace("ingest") as trace:
+                if pipelined:
+                    indexed=ingest_pdfs_pipelined(pdf_docs, trace)
+                else:
+                    indexed=[]
+                    with st.spinner("Processing....."):
+                        for pdf in pdf_docs:
+                            # calling text fn to get text data from pdf
+                            with trace.span("extract"):
+                                raw_text=get_pdf_text([pdf])
+                            # Converting that text into chunks (vectorization using Faiss)
+                            with trace.span("split"):
+                                text_chunks=get_text_chunks(raw_text)
+                            # Storing them chunks in local
+                            with trace.span("embed_and_index"):
+                                if get_vector_store(text_chunks, pdf):
+                                    indexed.append(pdf.name)
+                            trace.count("bytes", pdf.size)
+                            trace.count("chunks", len(text_chunks))
+                cache_stats=get_embedding_cache().stats()
+                trace.count("embedding_cache_hits", cache_stats["hits"] - cache_before["hits"])
+                trace.count("embedding_cache_misses", cache_stats["misses"] - cache_before["misses"])
+            if indexed:
+                st.success(f"Indexed {', '.join(indexed)}",icon="✅")
+            else:
+                st.info("Nothing new to index, these PDFs are already processed")
+            st.caption(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['bytes'] / 1e6:.1f} MB stored")
+
+        index_manager=get_index_manager(get_collection_folder())
+        index_manager.refresh()
+        if index_manager.legacy_documents:
+            legacy_warning(index_manager.legacy_documents)
+        if index_manager.documents:
+            st.subheader("Indexed PDFs")
+            for doc_hash, doc in list(index_manager.documents.items()):
+                col1, col2 = st.columns([4, 1])
+                pages=f" (pages {doc['pages'][0]}-{doc['pages'][1]})" if doc["pages"] else ""
+                col1.caption(f"{doc['name']}{pages}, {len(doc['chunk_ids'])} chunks")
+                if col2.button("✕", key=f"remove-{doc_hash}", help="Remove from index"):
+                    index_manager.remove_document(doc_hash)
+                    st.rerun()
+            registry_stats=get_index_registry().stats()
+            st.caption(f"Collection {st.session_state['collection']} · {registry_stats['indexes']} indexes resident ({registry_stats['bytes'] / 1e6:.1f} MB)")
+            index_meta=index_manager.index_meta
+            if index_meta:
+                st.caption(f"Index: {index_meta['kind']}, {index_meta['vectors']} vectors")
+                report=index_meta.get("report")
+                if report:
+                    st.caption(f"Recall@{report['k']} {report['recall_at_k']:.1%} vs exact search, "
+                               f"{report['index_ms_per_query']:.2f} ms/query ({report['flat_ms_per_query']:.2f} ms flat)")
+
+        jobs_panel("ingest")
+        latency_panel("chat")
+        latency_panel("ingest")
 
     # if __name__ == "__main__":
     #     main()
         
 
+# Transcripts and generated notes are shared by every session (and the worker), a popular lecture is only summarized once
+@st.cache_resource
+def get_transcript_cache():
+    return TranscriptCache(SUMMARY_CACHE_PATH)
+
+
+# Notes of the summary job this session submitted, once the worker has them in the summary cache
+def summary_job_status(pending):
+    job = get_job_queue().get(pending["id"])
+    if job is None:
+        return
+    if job["status"] == "done":
+        notes = get_transcript_cache().get_notes(pending["video_id"], pending["subject"], get_subject_prompt(pending["subject"]), SUMMARY_MODEL)
+        if notes:
+            st.markdown("Summary:")
+            st.write(notes)
+    elif job["status"] == "failed":
+        st.error(f"Summarizing {pending['video_id']} failed: {job['error']}")
+    else:
+        stage = (job["progress"] or {}).get("stage", job["status"])
+        st.info(f"Summarizing {pending['video_id']} in the background (job #{job['id']}, {stage}), the notes show up here when they are ready")
+    # Rerun the whole page once the job is over, which also stops the polling
+    if job["status"] in ("done", "failed") and pending.get("active", True):
+        pending["active"] = False
+        st.rerun()
+
+
 # --- YouTube Summarizer Page ---
 def youtube_summarizer_page():
-    # Getting the transcript from yt video
+    # Getting the transcript from yt video, as caption entries ({"text", "start", "duration"}) so summaries keep timestamps
     def extract_transcipt_details(youtube_video_url):
         try:
-            video_id=youtube_video_url.split("=")[1]
-            transcript_text=YouTubeTranscriptApi.get_transcript(video_id)
-
-            transcript = ""
-            for i in transcript_text:
-                transcript += " " + i["text"]
-            return transcript
+            video_id=video_id_from_url(youtube_video_url)
+            return fetch_transcript(video_id, get_transcript_cache())
         except Exception as e:
             raise e
 
 
-    def generate_gemini_content(transcript_text, subject):
-        if subject == "CS":
-            prompt = """
-                Title: Detailed Computer Science and Software Engineering Notes from YouTube Video Transcript
-
-                As a Computer Science and Software Engineering expert, your task is to provide detailed notes based on the transcript of a YouTube video I'll provide. Assume the role of a student and generate comprehensive notes covering the key concepts discussed in the video.
-
-                Your notes should:
-
-                - Highlight fundamental concepts,algorithms, syntax, and data structure discussed in the video.
-                - Explain any relevant concepts,related questions asked in interview,solution to said question, or real-world applications.
-                - Clarify any algorithm or method used and provide explanations for their significance along with their time complxity and space complexity.
-                - Dicuss their real life applications and better alternative to that code/methods used .
-                - Showcase/Generate code if seemed necessary to enhance understanding (preferred mostly if mentioned or used in the video).
-                - Do Use diagrams, illustrations, or examples to enhance understanding where necessary.
-                - Clarify if any mathematical equations or formulas introduced and provide explanations for their significance.
-                - Offer insights into software design patterns, coding best practices, version control systems, and testing methodologies.
-
-                Please provide the YouTube video transcript, and I'll generate the detailed Computer Science and Software Engineering notes accordingly.
-            """
-        elif subject == "Business Study":
-            prompt = """
-                Title: Detailed Business Study Notes from YouTube Video Transcript
-
-                As a Business expert, your task is to provide detailed notes based on the transcript of a YouTube video I'll provide. Assume the role of a student and generate comprehensive notes covering the key concepts discussed in the video.You have a deep understanding of various aspects of business operations, management, strategy, finance, marketing, and more.
-
-                Your notes should:
-
-                - Break down terms used and give explain their use in the video.
-                - Summarize the key findings and insights gained from the transcript.
-                - Include structured data, case studies, market reports, and financial statements for comprehensive learning if ant provided.
-                - Draw insights and lessons learned from the video that can be applied in similar contexts or industries.
-                - Conclude with actionable takeaways and implications for practitioners, policymakers, or researchers.
-                - Provide definitions and explanations of key business concepts such as: Marketing strategies , Financial analysis ,Supply chain      management, Customer relationship management, Market segmentation, Competitive analysis, Business models (e.g., B2B, B2C, etc.),Revenue streams and profitability, Risk management, Strategic planning
-
-            """
-        elif subject == "Generate codes":
-            prompt = """
-                Title: Generate programming codes from YouTube Video Transcript and official documentations
-
-                As a programming expert , your job is to generate and summarized all the code syntax and logic used in the youtube video , to give an accurate answer use your generative skills and official technology/language documentation to provide the code and the syntax used describing and explaning them
-
-                Your notes should:
-
-                - Highlight the code or syntax used and what are used for, also use different colors for codes (like in code editor).
-                - Provide a basic idea of the syntax , can refer to the documentations for that technology.
-                - Provide alternate methods to achieve the same task , or alternate tools/ technology to implement the same logic.
-                - Give it's real life application and industrial use.
-                - Try your absolute best to not to provide incorrect information , instead cite the resouces weher we can find them.
-                - Give basic functions and methods and other language specific information if described in the video .
-                
-                In the end section, conclude with language/technology syntax and modules/functions required to achieve the result/project/development-model, not going into in depth implementation of them but the basic use of them (summarize in one line) and things to remember when using them and also resources link to where find them if possible.
-                
-            """
-        elif subject == "Mathematics":
-            prompt = """
-                Title: Detailed Mathematics Notes from YouTube Video Transcript
-
-                As a mathematics expert, your task is to provide detailed notes based on the transcript of a YouTube video I'll provide. Assume the role of a student and generate comprehensive notes covering the key mathematical concepts discussed in the video.
-
-                Your notes should:
-
-                - Outline mathematical concepts, formulas, and problem-solving techniques covered in the video.
-                - Provide step-by-step explanations for solving mathematical problems discussed.
-                - Clarify any theoretical foundations or mathematical principles underlying the discussed topics.
-                - Include relevant examples or practice problems to reinforce understanding.
-
-                Please provide the YouTube video transcript, and I'll generate the detailed mathematics notes accordingly.
-            """
-        elif subject == "Data Science and Statistics":
-            prompt = """
-                Title: Comprehensive Notes on Data Science and Statistics from YouTube Video Transcript
-
-                Subject: Data Science and Statistics
-
-                Prompt:
-
-                As an expert in Data Science and Statistics, your task is to provide comprehensive notes based on the transcript of a YouTube video I'll provide. Assume the role of a student and generate detailed notes covering the key concepts discussed in the video.
-
-                Your notes should:
-
-                Data Science:
-
-                Explain fundamental concepts in data science such as data collection, data cleaning, data analysis, and data visualization.
-                Discuss different techniques and algorithms used in data analysis and machine learning, including supervised and unsupervised learning methods.
-                Provide insights into real-world applications of data science in various fields like business, healthcare, finance, etc.
-                Include discussions on data ethics, privacy concerns, and best practices in handling sensitive data.
-                Statistics:
-
-                Outline basic statistical concepts such as measures of central tendency, variability, and probability distributions.
-                Explain hypothesis testing, confidence intervals, and regression analysis techniques.
-                Clarify the importance of statistical inference and its role in drawing conclusions from data.
-                Provide examples or case studies demonstrating the application of statistical methods in solving real-world problems.
-
-                Your notes should aim to offer a clear understanding of both the theoretical foundations and practical applications of data science and statistics discussed in the video. Use clear explanations, examples, and visuals where necessary to enhance comprehension.
-
-                Please provide the YouTube video transcript, and I'll generate the detailed notes on Data Science and Statistics accordingly.
-            """
-        elif subject == "Case Study":
-            prompt = """
-                Title: Comprehensive Notes on Case Study from YouTube Video Transcript
-
-                Subject: Case Study
-
-                Objective: The objective of this case study analysis is to examine and explore real-world scenarios across diverse domains, encompassing business, education, research, decision-making, policy development, knowledge sharing, and marketing communication. The aim is to leverage case studies as valuable tools for problem-solving, learning, decision-making, and knowledge dissemination, while also considering their role in informing policy development and supporting marketing efforts.
-
-                Prompt:
-
-                As an expert in Case Study, your task is to provide comprehensive notes based on the transcript of a YouTube video I'll provide. Assume the role of a student and generate detailed notes covering the key concepts discussed in the video.
-
-                Your notes should:
-
-                Case Study:
-
-                Identify and analyze real-world problems or challenges faced by individuals, organizations, or communities across various domains.
-                Explore the underlying factors contributing to the identified problems and assess their implications.
-                Utilize case study methodology to investigate and analyze complex phenomena, theories, and practical applications across different disciplines.
-                Apply qualitative and quantitative research methods to gather and analyze data, including interviews, surveys, observations, and statistical analysis.
-
-                Evaluate the role of case studies as effective teaching and learning tools in academic and professional settings.
-                Assess the impact of case studies on student engagement, critical thinking, problem-solving skills, and knowledge acquisition.
-
-                Explore the role of case studies in sharing best practices, lessons learned, and successful strategies across industries, sectors, and communities.
-                Assess the effectiveness of different knowledge-sharing platforms and communication channels in disseminating case study findings to diverse audiences.Analyze successful case study campaigns and their impact on brand reputation, customer engagement, and market positioning.
-
-                Conclusion: 
-
-                Conclude the case study analysis with actionable takeaways, insights, and implications for practitioners, policymakers, researchers, educators, business leaders, and other stakeholders across different domains. Emphasize the importance of leveraging case studies as powerful instruments for problem-solving, learning, decision-making, knowledge sharing, and strategic communication in today's dynamic and interconnected world.
-
-                Please provide the YouTube video transcript, and I'll generate the detailed notes on Case Study accordingly.
-            """
-        else:
-            prompt="""You are Youtube video summarizer. You will be taking the transcript text and summarizing the entire video and providing the important summary in points within 500 words or as much as needed to summarize it completely and not miss any important point.Please Provide the summary of the text given here: """
-
-
-        model = genai.GenerativeModel('gemini-pro')
-        response = model.generate_content(prompt + transcript_text)
-        return response.text
+    # Yields the notes as they are generated
+    def stream_gemini_content(transcript_entries, subject, summarizer):
+        return summarizer.summarize_stream(transcript_entries, get_subject_prompt(subject))
 
     # def generate_gemini_content(transcript_text,prompt):
 
@@ -329,19 +503,76 @@ def youtube_summarizer_page():
 
     st.title("Youtube Video Summarizer")
     youtube_link = st.text_input("Enter the Video Url")
-    subject = st.selectbox("Select Subject:", ["CS", "Business Study", "Generate codes", "Mathematics", "Data Science and Statistics" , "Case Study" , "Youtube"])
+    subject = st.selectbox("Select Subject:", SUBJECTS)
 
     if youtube_link:
-        video_id = youtube_link.split('=')[1]
+        video_id = video_id_from_url(youtube_link)
         st.image(f"http://img.youtube.com/vi/{video_id}/0.jpg", use_column_width=True)
 
-    if st.button("Get Detailed Summary"):
-        transcript_text = extract_transcipt_details(youtube_link)
+    col1, col2 = st.columns(2)
+    summarize_now = col1.button("Get Detailed Summary")
+    # Notes are written by the background worker unless streamed here, which ties up the page until they are done
+    stream_here = col2.toggle("Stream in this page", value=False, help="Generate the notes here as they are written instead of in the background worker")
+
+    with st.expander("Queue several videos"):
+        playlist = st.text_area("One video url or id per line")
+        if st.button("Queue all") and playlist.strip():
+            video_ids = [video_id_from_url(line) for line in playlist.splitlines() if line.strip()]
+            for playlist_video_id in video_ids:
+                submit_summary(get_job_queue(), playlist_video_id, subject)
+            ensure_worker()
+            st.info(f"Queued {len(video_ids)} videos for {subject} notes")
+
+    if summarize_now and youtube_link:
+        with get_telemetry().trace("summary") as trace:
+            timer = RequestTimer("summary")
+            cache = get_transcript_cache()
+            with trace.span("notes_cache"):
+                cached_notes = cache.get_notes(video_id, subject, get_subject_prompt(subject), SUMMARY_MODEL)
+
+            if cached_notes is not None:
+                trace.count("notes_cache_hits")
+                st.markdown("Summary:")
+                st.write(cached_notes)
+                st.caption("Served from the summary cache")
+            elif not stream_here:
+                # The worker writes the notes to the summary cache, summary_job_status shows them from there
+                st.session_state["summary_job"] = {"id": submit_summary(get_job_queue(), video_id, subject),
+                                                   "video_id": video_id, "subject": subject}
+                ensure_worker()
+            else:
+                transcript_hits = cache.hits["transcript"]
+                with trace.span("transcript"):
+                    transcript_entries = extract_transcipt_details(youtube_link)
+                trace.count("transcript_cache_hits", cache.hits["transcript"] - transcript_hits)
+
+                if transcript_entries:
+                    trace.count("transcript_tokens", sum(estimate_tokens(entry["text"]) for entry in transcript_entries))
+                    summarizer = make_summarizer()
+                    st.markdown("Summary:")
+                    with trace.span("llm"):
+                        summary = st.write_stream(timed_stream(stream_gemini_content(transcript_entries, subject, summarizer), timer))
+                    if timer.ttft is not None:
+                        trace.add_span("time_to_first_token", timer.ttft)
+                    trace.count("segments", summarizer.segments)
+                    if isinstance(summary, str) and summary:
+                        trace.count("summary_tokens", estimate_tokens(summary))
+                        cache.put_notes(video_id, subject, get_subject_prompt(subject), SUMMARY_MODEL, summary)
+                    if summarizer.segments > 1:
+                        st.caption(f"Long video: summarized {summarizer.segments} segments in parallel and merged the notes")
+                    st.caption(f"First token after {timer.ttft or 0:.2f}s, full notes in {timer.total:.2f}s")
+
+        cache_stats = cache.stats()
+        st.caption(f"Summary cache: {cache_stats['hit_ratio']:.0%} hit ratio ({cache_stats['hits']} hits, {cache_stats['misses']} misses), {cache_stats['notes']} notes and {cache_stats['transcripts']} transcripts, {cache_stats['bytes'] / 1e6:.1f} MB stored")
+
+    pending = st.session_state.get("summary_job")
+    if pending is not None:
+        job = get_job_queue().get(pending["id"])
+        poll_while_active(summary_job_status, job is not None and job["status"] in ("queued", "running"), pending)
 
-        if transcript_text:
-            summary=generate_gemini_content(transcript_text,subject)
-            st.markdown("Summary:")
-            st.write(summary)
+    with st.sidebar:
+        jobs_panel("summarize")
+        latency_panel("summary")
 
 # --- Main App Logic ---
 # PAGES = {
@@ -0,0 +1,308 @@
+"""Offline benchmarks for the ingest, query and summarization paths.
+
+Runs against FakeEmbeddings / FakeChatModel and synthetic PDFs and transcripts, so no API key
+or network is needed. The serial and pipelined ingest of every corpus size run in fresh
+processes, so each reports its own peak memory. Results are printed (or written with --output)
+as JSON to compare runs between versions:
+
+    python benchmark.py --sizes 50 200 1000 --output bench.json
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PyPDF2 import PdfReader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.vectorstores import FAISS
+
+from embedding_executor import BatchedEmbeddings
+from fake_models import FakeChatModel, FakeEmbeddings
+from ingest import IngestPipeline
+from retrieval import Retriever
+from summarizer import TranscriptSummarizer
+
+
+VOCABULARY = (
+    "algorithm array assignment binary complexity data deadline derivative distribution equation "
+    "function gradient graph hash integral lecture matrix memory model network node probability "
+    "proof question queue recursion regression sample semester sorting stack statistics submission "
+    "syllabus theorem tree variable vector"
+).split()
+
+
+def synthetic_pdf(pages, words_per_page=350, seed=0):
+    """Build a text-only PDF that PyPDF2 can extract, without any PDF writing dependency."""
+    rng = random.Random(seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for _ in range(pages):
+        words = [rng.choice(VOCABULARY) for _ in range(words_per_page)]
+        lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+        content = ("BT /F1 10 Tf 12 TL 50 780 Td " + " ".join(f"({line}) '" for line in lines) + " ET").encode("ascii")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def extract_page_range(data, start, stop):
+    # The serial path's extraction, get_pdf_text over bytes instead of an upload
+    reader = PdfReader(io.BytesIO(data))
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def synthetic_transcript(minutes, seed=0):
+    # Caption entries shaped like YouTubeTranscriptApi.get_transcript output, one every ~4 seconds
+    rng = random.Random(seed)
+    entries = []
+    start = 0.0
+    while start < minutes * 60:
+        duration = rng.uniform(2.5, 5.5)
+        entries.append({"text": " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(6, 14))),
+                        "start": round(start, 2), "duration": round(duration, 2)})
+        start += duration
+    return entries
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+    return {"p50": rank(50), "p95": rank(95), "p99": rank(99), "mean": sum(ordered) / len(ordered)}
+
+
+def peak_rss_mb(tree=None):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS, and the peak over the whole process
+    # lifetime, see in_fresh_process. The extraction pool runs under a forkserver and is never a
+    # child of this process, so it only shows up in the sampled process tree
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {"self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor,
+            "tree": tree.peak_mb if tree is not None else None}
+
+
+def _process_tree_rss(root):
+    # Resident memory of ``root`` and all its descendants, from /proc
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="utf-8") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name can contain spaces, the fields after it can't
+        parents[int(entry)] = int(stat.rsplit(")", 1)[1].split()[1])
+    tree, frontier = {root}, [root]
+    while frontier:
+        pid = frontier.pop()
+        for child, parent in parents.items():
+            if parent == pid and child not in tree:
+                tree.add(child)
+                frontier.append(child)
+    rss = 0
+    for pid in tree:
+        try:
+            with open(f"/proc/{pid}/statm", encoding="utf-8") as f:
+                rss += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            continue
+    return rss
+
+
+class TreeRssSampler:
+    """Peak combined RSS of this process and its descendants while the block runs, sampled every ``interval`` seconds.
+
+    Needs /proc, ``peak_mb`` stays ``None`` elsewhere.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self):
+        if os.path.isdir("/proc"):
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _sample(self):
+        pid = os.getpid()
+        while True:
+            rss_mb = _process_tree_rss(pid) / (1024 * 1024)
+            self.peak_mb = max(self.peak_mb or 0.0, rss_mb)
+            if self._stop.wait(self.interval):
+                return
+
+
+def make_embeddings(args):
+    # Batched and paced like the app's client, so both ingest paths pay the fake latency per request the same way
+    client = FakeEmbeddings(dimensions=args.dimensions, latency=args.embed_latency)
+    return BatchedEmbeddings(client, batch_size=args.embed_batch_size, max_concurrency=args.embed_concurrency,
+                             requests_per_second=args.embed_requests_per_second)
+
+
+def in_fresh_process(function, *args):
+    # ru_maxrss never goes down, so every measured phase gets a process of its own
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(function, *args).result()
+
+
+def bench_serial(documents, args):
+    """Serial ingest, as get_pdf_text -> get_text_chunks -> get_vector_store, then queries against the result."""
+    embeddings = make_embeddings(args)
+    chat = FakeChatModel(args.chat_first_token, args.chat_tokens_per_second)
+    pages = sum(count for _, _, count in documents)
+
+    with TreeRssSampler() as tree:
+        started = time.perf_counter()
+        text = "".join(page for _, data, count in documents for page in extract_page_range(data, 0, count))
+        extracted = time.perf_counter()
+        chunks = RecursiveCharacterTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap).split_text(text)
+        split = time.perf_counter()
+        vector_store = FAISS.from_texts(chunks, embeddings)
+        built = time.perf_counter()
+    ingest = {
+        "pages": pages,
+        "chunks": len(chunks),
+        "extract_seconds": extracted - started,
+        "extract_pages_per_second": pages / (extracted - started),
+        "split_seconds": split - extracted,
+        "chunks_per_second": len(chunks) / (split - extracted) if split > extracted else None,
+        "index_build_seconds": built - split,
+        "serial_total_seconds": built - started,
+        "serial_pages_per_second": pages / (built - started),
+    }
+    rss = peak_rss_mb(tree)
+    # Measured after the ingest peak was taken, queries barely allocate
+    query = bench_query(vector_store, chat, args.queries, args.token_budget)
+    return ingest, query, rss
+
+
+def bench_pipelined(documents, args):
+    embeddings = make_embeddings(args)
+    pages = sum(count for _, _, count in documents)
+    # One pipeline batch keeps every concurrent embedding request busy, as in the app
+    pipeline = IngestPipeline(embeddings, chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap,
+                              batch_size=args.embed_batch_size * args.embed_concurrency)
+    with TreeRssSampler() as tree:
+        started = time.perf_counter()
+        pipeline.run([(name, data) for name, data, _ in documents])
+        seconds = time.perf_counter() - started
+    return {"pipelined_total_seconds": seconds, "pipelined_pages_per_second": pages / seconds}, peak_rss_mb(tree)
+
+
+def bench_query(vector_store, chat, queries, token_budget, seed=0):
+    rng = random.Random(seed)
+    retriever = Retriever(token_budget=token_budget)
+    retrieval, total = [], []
+    for _ in range(queries):
+        question = "what is the " + " ".join(rng.choice(VOCABULARY) for _ in range(3))
+        started = time.perf_counter()
+        docs = retriever.retrieve(vector_store, question)
+        retrieved = time.perf_counter()
+        chat.generate("\n\n".join(doc.page_content for doc in docs) + question)
+        finished = time.perf_counter()
+        retrieval.append(retrieved - started)
+        total.append(finished - started)
+    return {"queries": queries, "retrieval_seconds": percentiles(retrieval), "total_seconds": percentiles(total)}
+
+
+def bench_summary(chat, minutes, segment_tokens, workers):
+    entries = synthetic_transcript(minutes)
+    summarizer = TranscriptSummarizer(chat.generate, max_segment_tokens=segment_tokens, max_workers=workers)
+    started = time.perf_counter()
+    summarizer.summarize(entries, "Summarize the lecture: ")
+    return {"minutes": minutes, "entries": len(entries), "segments": summarizer.segments,
+            "requests": chat.requests, "seconds": time.perf_counter() - started}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000], help="corpus sizes in pages")
+    parser.add_argument("--pages-per-doc", type=int, default=25)
+    parser.add_argument("--words-per-page", type=int, default=350)
+    parser.add_argument("--chunk-size", type=int, default=1500)
+    parser.add_argument("--chunk-overlap", type=int, default=150)
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="seconds per fake embedding request")
+    parser.add_argument("--embed-batch-size", type=int, default=32)
+    parser.add_argument("--embed-concurrency", type=int, default=4)
+    parser.add_argument("--embed-requests-per-second", type=float, default=1000.0)
+    parser.add_argument("--chat-first-token", type=float, default=0.0, help="seconds before the fake model's first token")
+    parser.add_argument("--chat-tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--token-budget", type=int, default=3000)
+    parser.add_argument("--video-minutes", type=int, nargs="+", default=[10, 60, 180])
+    parser.add_argument("--summary-segment-tokens", type=int, default=8000)
+    parser.add_argument("--summary-workers", type=int, default=4)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "corpus": [],
+        "summary": [],
+    }
+    for size in args.sizes:
+        documents = []
+        for number, start in enumerate(range(0, size, args.pages_per_doc)):
+            pages = min(args.pages_per_doc, size - start)
+            documents.append((f"doc{number}.pdf", synthetic_pdf(pages, args.words_per_page, seed=number), pages))
+        ingest, query, serial_rss = in_fresh_process(bench_serial, documents, args)
+        pipelined, pipelined_rss = in_fresh_process(bench_pipelined, documents, args)
+        ingest.update(pipelined)
+        report["corpus"].append({"pages": size, "ingest": ingest, "query": query,
+                                 "peak_rss_mb": {"serial": serial_rss, "pipelined": pipelined_rss}})
+        # End to end both ways, extraction alone is in extract_pages_per_second
+        print(f"{size} pages: ingest {ingest['serial_pages_per_second']:.0f} pages/s serial, "
+              f"{ingest['pipelined_pages_per_second']:.0f} pages/s pipelined, "
+              f"query p95 {query['total_seconds']['p95'] * 1000:.1f} ms", file=sys.stderr)
+
+    for minutes in args.video_minutes:
+        chat = FakeChatModel(args.chat_first_token, args.chat_tokens_per_second)
+        report["summary"].append(bench_summary(chat, minutes, args.summary_segment_tokens, args.summary_workers))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
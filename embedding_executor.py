@@ -0,0 +1,101 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+
+
+# HTTP statuses of quota and transient server errors; both the google.api_core exceptions
+# (ResourceExhausted, ServiceUnavailable, DeadlineExceeded, ...) and the google.genai ones carry them as ``code``
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+# RuntimeError is what FakeEmbeddings raises for a simulated failure
+RETRYABLE_ERRORS = (RuntimeError, TimeoutError, ConnectionError)
+
+
+def is_retryable(error):
+    """Whether ``error`` (or the error it wraps, as langchain_google_genai does) is worth retrying."""
+    while error is not None:
+        if isinstance(error, RETRYABLE_ERRORS) or getattr(error, "code", None) in RETRYABLE_STATUS_CODES:
+            return True
+        error = error.__cause__
+    return False
+
+
+class TokenBucket:
+    """Allows ``rate`` requests per second on average with bursts of up to ``capacity``."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class BatchedEmbeddings(Embeddings):
+    """Embeds documents in fixed-size batches with a bounded number of requests in flight.
+
+    Requests are paced by a token bucket so a large upload stays under the API quota, and a
+    batch that fails with a quota or transient error is retried on its own with jittered
+    exponential backoff, the batches that already succeeded are kept. Other errors (a bad key,
+    an invalid request) are raised right away.
+    """
+
+    def __init__(self, embeddings, batch_size=32, max_concurrency=4, requests_per_second=2.0,
+                 max_retries=5, base_delay=1.0, max_delay=30.0):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.bucket = TokenBucket(requests_per_second)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.requests = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        batches = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1:
+            return self._embed_batch(batches[0])
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+            results = list(pool.map(self._embed_batch, batches))
+        return [vector for batch in results for vector in batch]
+
+    def embed_query(self, text):
+        return self._with_retries(self.embeddings.embed_query, text)
+
+    def _embed_batch(self, batch):
+        return self._with_retries(self.embeddings.embed_documents, batch)
+
+    def _with_retries(self, request, payload):
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            with self._lock:
+                self.requests += 1
+            try:
+                return request(payload)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries or not is_retryable(e):
+                    raise
+                with self._lock:
+                    self.retries += 1
+                # Full jitter keeps concurrent batches that hit the quota together from retrying in lockstep
+                time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))))
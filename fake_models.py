@@ -0,0 +1,78 @@
+import hashlib
+import math
+import random
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+
+# Local stand-ins for the Google models so pipelines can be exercised offline
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic embeddings derived from a hash of the text.
+
+    ``latency`` is slept once per request and ``failure_rate`` makes that fraction of requests
+    raise, which is enough to measure batching, concurrency and retry behaviour without the API.
+    """
+
+    def __init__(self, dimensions=768, latency=0.0, failure_rate=0.0, seed=0):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _vector(self, text):
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+        vector = [rng.gauss(0.0, 1.0) for _ in range(self.dimensions)]
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def _request(self):
+        with self._lock:
+            self.requests += 1
+            failed = self._random.random() < self.failure_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            raise RuntimeError("fake embedding request failed")
+
+    def embed_documents(self, texts):
+        self._request()
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self._request()
+        return self._vector(text)
+
+
+class FakeChatModel:
+    """Chat model stand-in that answers with deterministic filler text.
+
+    ``first_token_latency`` is slept before the first token and ``tokens_per_second`` paces the
+    rest (0 means as fast as possible), so streaming and end-to-end timings behave like a real model.
+    """
+
+    def __init__(self, first_token_latency=0.0, tokens_per_second=0.0, answer_tokens=200):
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def stream(self, prompt):
+        with self._lock:
+            self.requests += 1
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+        if self.first_token_latency:
+            time.sleep(self.first_token_latency)
+        for i in range(self.answer_tokens):
+            if i and self.tokens_per_second:
+                time.sleep(1.0 / self.tokens_per_second)
+            yield f"token{rng.randrange(1000)} "
+
+    def generate(self, prompt):
+        return "".join(self.stream(prompt))
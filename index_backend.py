@@ -0,0 +1,288 @@
+import glob
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+
+INDEX_KINDS = ("flat", "ivf", "ivfpq", "hnsw")
+
+logger = logging.getLogger(__name__)
+
+
+class IndexConfig:
+    """Which FAISS index type a collection uses once it has grown past ``min_train`` vectors.
+
+    Collections start out as an exact flat index; at save time a large enough one is converted
+    to ``kind``, trained on a sample of at most ``train_sample`` of its vectors.
+    """
+
+    def __init__(self, kind="flat", nlist=None, nprobe=8, pq_m=16, pq_bits=8, hnsw_m=32,
+                 ef_search=64, min_train=2000, train_sample=20000):
+        if kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown index type {kind!r}, expected one of {', '.join(INDEX_KINDS)}")
+        self.kind = kind
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_m = pq_m
+        self.pq_bits = pq_bits
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.min_train = min_train
+        self.train_sample = train_sample
+
+
+def index_kind(index):
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def _configure(index, config):
+    # Search-time knobs aren't all persisted by write_index, and MMR needs reconstruct() on IVF
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = config.nprobe
+        index.make_direct_map()
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = config.ef_search
+    return index
+
+
+def build_index(config, vectors):
+    dimensions = vectors.shape[1]
+    if config.kind == "hnsw":
+        return faiss.IndexHNSWFlat(dimensions, config.hnsw_m)
+    # Rule of thumb is ~sqrt(n) lists, with at least 39 training points per list
+    nlist = config.nlist or max(1, min(int(np.sqrt(len(vectors))), len(vectors) // 39))
+    quantizer = faiss.IndexFlatL2(dimensions)
+    if config.kind == "ivfpq":
+        # The number of sub-quantizers has to divide the dimension
+        pq_m = config.pq_m
+        while dimensions % pq_m:
+            pq_m -= 1
+        # Smaller codebooks for small collections, each of the 2**bits centroids wants ~39 points
+        pq_bits = config.pq_bits
+        while pq_bits > 4 and len(vectors) < 39 * 2 ** pq_bits:
+            pq_bits -= 1
+        return faiss.IndexIVFPQ(quantizer, dimensions, nlist, pq_m, pq_bits)
+    return faiss.IndexIVFFlat(quantizer, dimensions, nlist)
+
+
+def evaluate_index(index, vectors, k=10, queries=100, seed=0):
+    """Recall@k and per-query latency of ``index`` against exact search over ``vectors``."""
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), size=min(queries, len(vectors)), replace=False)]
+    sample = sample + rng.normal(0, 0.01, sample.shape).astype(np.float32)
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    k = min(k, len(vectors))
+
+    started = time.perf_counter()
+    for query in sample:
+        exact.search(query[None, :], k)
+    exact_seconds = time.perf_counter() - started
+    _, truth = exact.search(sample, k)
+
+    started = time.perf_counter()
+    for query in sample:
+        index.search(query[None, :], k)
+    index_seconds = time.perf_counter() - started
+    _, found = index.search(sample, k)
+
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return {
+        "kind": index_kind(index),
+        "vectors": len(vectors),
+        "queries": len(sample),
+        "k": k,
+        "recall_at_k": hits / (len(sample) * k),
+        "flat_ms_per_query": exact_seconds * 1000 / len(sample),
+        "index_ms_per_query": index_seconds * 1000 / len(sample),
+    }
+
+
+def maybe_convert(vector_store, config, seed=0):
+    """Swap a flat store's index for the configured type once it is large enough to train.
+
+    Returns the recall/latency report of the new index, or ``None`` if nothing changed.
+    """
+    index = vector_store.index
+    if config.kind == "flat" or index_kind(index) != "flat" or index.ntotal < config.min_train:
+        return None
+    vectors = index.reconstruct_n(0, index.ntotal)
+    new_index = build_index(config, vectors)
+    if not new_index.is_trained:
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), size=min(config.train_sample, len(vectors)), replace=False)]
+        new_index.train(sample)
+    new_index.add(vectors)
+    _configure(new_index, config)
+    vector_store.index = new_index
+    return evaluate_index(new_index, vectors)
+
+
+def rebuild_without(vector_store, ids, embeddings):
+    """Copy of ``vector_store`` without ``ids``, as a flat store.
+
+    Trained indexes can't drop vectors in place (and PQ codes can't be turned back into
+    vectors), so the remaining chunks are re-embedded; with a ``CachedEmbeddings`` client those
+    are all cache hits.
+    """
+    doomed = set(ids)
+    remaining = [(i, doc_id) for i, doc_id in sorted(vector_store.index_to_docstore_id.items()) if doc_id not in doomed]
+    if not remaining:
+        return None
+    docs = [vector_store.docstore.search(doc_id) for _, doc_id in remaining]
+    texts = [doc.page_content for doc in docs]
+    vectors = embeddings.embed_documents(texts)
+    return FAISS.from_embeddings(list(zip(texts, vectors)), embeddings,
+                                 metadatas=[doc.metadata for doc in docs], ids=[doc_id for _, doc_id in remaining])
+
+
+def clone_store(vector_store, config=None):
+    """Independent copy of an in-memory store, documents are shared since they are never modified."""
+    index = faiss.clone_index(vector_store.index)
+    docstore = InMemoryDocstore(dict(vector_store.docstore._dict))
+    return FAISS(vector_store.embedding_function, _configure(index, config or IndexConfig()), docstore,
+                 dict(vector_store.index_to_docstore_id))
+
+
+class SQLiteDocstore(Docstore):
+    """Read-only docstore over the sqlite file written by ``save_store``, rows are fetched on demand."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def search(self, search):
+        with self._lock:
+            row = self._conn.execute("SELECT page_content, metadata FROM docs WHERE id=?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def text_bytes(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(LENGTH(page_content)), 0) FROM docs").fetchone()[0]
+
+
+def save_store(vector_store, folder, version, report=None):
+    """Write the index and a sqlite docstore under version-stamped names, then point ``index_meta.json`` at them.
+
+    Readers that still have the previous version open (or memory-mapped) keep working, files
+    older than the previous version are removed.
+    """
+    os.makedirs(folder, exist_ok=True)
+    index_file = f"index-{version}.faiss"
+    docstore_file = f"docstore-{version}.sqlite"
+    faiss.write_index(vector_store.index, os.path.join(folder, index_file))
+
+    docstore_path = os.path.join(folder, docstore_file)
+    if os.path.exists(docstore_path):
+        os.remove(docstore_path)
+    conn = sqlite3.connect(docstore_path)
+    conn.execute("CREATE TABLE docs (position INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, page_content TEXT NOT NULL, metadata TEXT NOT NULL)")
+    rows = []
+    for position, doc_id in sorted(vector_store.index_to_docstore_id.items()):
+        doc = vector_store.docstore.search(doc_id)
+        rows.append((position, doc_id, doc.page_content, json.dumps(doc.metadata)))
+    conn.executemany("INSERT INTO docs VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+    previous = read_meta(folder)
+    meta = {
+        "format": 1,
+        "version": version,
+        "index_file": index_file,
+        "docstore_file": docstore_file,
+        "kind": index_kind(vector_store.index),
+        "dimensions": vector_store.index.d,
+        "vectors": vector_store.index.ntotal,
+        # Keep the last build report until the index is trained again
+        "report": report or (previous or {}).get("report"),
+    }
+    tmp_path = os.path.join(folder, "index_meta.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(folder, "index_meta.json"))
+    _remove_old_versions(folder, keep={version, previous["version"]} if previous else {version})
+    return meta
+
+
+def remove_store(folder):
+    meta_path = os.path.join(folder, "index_meta.json")
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    _remove_old_versions(folder, keep=set())
+
+
+def _remove_old_versions(folder, keep):
+    for path in glob.glob(os.path.join(folder, "index-*.faiss")) + glob.glob(os.path.join(folder, "docstore-*.sqlite")):
+        version = os.path.basename(path).split("-", 1)[1].split(".", 1)[0]
+        if version.isdigit() and int(version) not in keep:
+            try:
+                os.remove(path)
+            except OSError:
+                # Still open by a reader on a platform that doesn't allow it, retry next save
+                pass
+
+
+def read_meta(folder):
+    meta_path = os.path.join(folder, "index_meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_store(folder, embeddings, config=None, mmap=True):
+    """Open the current version of a saved store.
+
+    With ``mmap`` the index is memory-mapped and documents are read from sqlite as results need
+    them, so opening is nearly instant and the store is read-only. Without it everything is read
+    into memory and the store can be modified and saved again.
+    """
+    meta = read_meta(folder)
+    if meta is None:
+        return None
+    config = config or IndexConfig()
+    index_path = os.path.join(folder, meta["index_file"])
+    docstore_path = os.path.join(folder, meta["docstore_file"])
+    if mmap:
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        # The in-place mapping of IO_FLAG_MMAP_IFC only reads flat and HNSW files, IVF lists are
+        # mapped by IO_FLAG_MMAP alone
+        if meta["kind"] in ("flat", "hnsw"):
+            flags |= getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+        try:
+            index = faiss.read_index(index_path, flags)
+        except RuntimeError as e:
+            logger.warning("Could not memory-map %s (%s), reading it into memory", index_path, e)
+            index = faiss.read_index(index_path)
+        docstore = SQLiteDocstore(docstore_path)
+        with closing(sqlite3.connect(f"file:{docstore_path}?mode=ro", uri=True)) as conn:
+            mapping = dict(conn.execute("SELECT position, id FROM docs"))
+    else:
+        index = faiss.read_index(index_path)
+        with closing(sqlite3.connect(f"file:{docstore_path}?mode=ro", uri=True)) as conn:
+            rows = conn.execute("SELECT position, id, page_content, metadata FROM docs").fetchall()
+        docstore = InMemoryDocstore({doc_id: Document(page_content=text, metadata=json.loads(metadata))
+                                     for _, doc_id, text, metadata in rows})
+        mapping = {position: doc_id for position, doc_id, _, _ in rows}
+    return FAISS(embeddings, _configure(index, config), docstore, mapping)
@@ -0,0 +1,232 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows, writers are then only serialized within one process
+    fcntl = None
+
+from langchain_community.vectorstores import FAISS
+
+from index_backend import (IndexConfig, clone_store, index_kind, load_store, maybe_convert, read_meta, rebuild_without,
+                           remove_store, save_store)
+from ingest import document_hash
+
+
+class IndexManager:
+    """Keeps one FAISS index per folder and grows it a document at a time.
+
+    ``manifest.json`` next to the index records which chunk ids came from which file (by content
+    hash and page range), so a single document can be removed or replaced without re-embedding
+    the rest of the collection. Every change holds an exclusive lock on ``.lock`` in the folder
+    from re-reading the manifest to saving, so the app and the background worker can write the
+    same collection without losing each other's documents.
+
+    With a ``registry`` a copy of the freshly saved store is handed over to it for querying, so
+    searches never run against an index that is being written while the manager keeps its own
+    copy for the next upload instead of reading the whole index back from disk.
+    ``index_config`` picks the FAISS index type, see ``index_backend``. The manifest is re-read
+    whenever another process has rewritten it, see ``refresh``. A ``shared`` collection is marked
+    as such in its manifest and offered to every session of the app, see ``list_collections``.
+    """
+
+    def __init__(self, folder, embeddings, registry=None, index_config=None, shared=False):
+        self.folder = folder
+        self.embeddings = embeddings
+        self.registry = registry
+        self.shared = shared
+        self.index_config = index_config or IndexConfig()
+        self.manifest_path = os.path.join(folder, "manifest.json")
+        self._lock = threading.Lock()
+        self.manifest = {"version": 0, "documents": {}}
+        # Names of documents dropped because the collection was saved in the old pickled format
+        self.legacy_documents = []
+        self._manifest_mtime = None
+        self.vector_store = None
+        self._loaded = False
+        self._refresh()
+
+    @property
+    def version(self):
+        return self.manifest["version"]
+
+    @property
+    def documents(self):
+        return self.manifest["documents"]
+
+    def has_document(self, doc_hash):
+        return doc_hash in self.manifest["documents"]
+
+    def refresh(self):
+        """Pick up a version saved by another process, e.g. the background worker. Returns True if it changed."""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self, force=False):
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._manifest_mtime and not force:
+            return False
+        with open(self.manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        self._manifest_mtime = mtime
+        # Versions only grow under the write lock, the same number means the same content
+        if manifest["version"] == self.version:
+            return False
+        self.manifest = manifest
+        # Indexes from before index_backend were pickled and have no index_meta.json; they are not
+        # unpickled, their documents are dropped and come back from the embedding cache when re-uploaded
+        self.legacy_documents = []
+        if self.documents and read_meta(self.folder) is None:
+            self.legacy_documents = sorted(doc["name"] for doc in self.documents.values())
+            self.manifest["documents"] = {}
+        # Whatever was loaded belongs to the old version
+        self.vector_store = None
+        self._loaded = False
+        return True
+
+    def _load(self):
+        # The index is only read when it is about to change, listing documents needs just the manifest
+        if self._loaded:
+            return
+        self._loaded = True
+        self.vector_store = load_store(self.folder, self.embeddings, self.index_config, mmap=False)
+
+    @contextmanager
+    def _writing(self):
+        # Another process may have saved since we last looked, only change the latest version
+        with self._lock:
+            os.makedirs(self.folder, exist_ok=True)
+            with open(os.path.join(self.folder, ".lock"), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    # Two saves can land within one mtime tick, so compare versions rather than trust the mtime
+                    self._refresh(force=True)
+                    yield
+                except BaseException:
+                    self._discard()
+                    raise
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _discard(self):
+        # A failed change may have left chunks in the store or documents out of the manifest,
+        # start over from what is on disk
+        self.manifest = {"version": 0, "documents": {}}
+        self.vector_store = None
+        self._loaded = False
+        self._manifest_mtime = None
+        self._refresh()
+
+    @property
+    def index_meta(self):
+        return read_meta(self.folder)
+
+    def add_documents(self, documents, pipeline, on_progress=None):
+        """Append ``(name, pdf_bytes)`` documents to the index with ``pipeline``.
+
+        Files already indexed with identical content are skipped, and a file whose name is
+        indexed with different content replaces the old copy. Files without any text are skipped
+        too and an older copy of them is kept (see ``IngestStats.empty_documents``). If anything
+        fails the collection is left as it was on disk. Returns the names actually indexed.
+        """
+        with self._writing():
+            self._load()
+            new_documents = []
+            for name, data in documents:
+                doc_hash = document_hash(data)
+                if self.has_document(doc_hash) or any(doc_hash == h for h, _, _ in new_documents):
+                    continue
+                new_documents.append((doc_hash, name, data))
+            if not new_documents:
+                return []
+            self.vector_store = pipeline.run([(name, data) for _, name, data in new_documents],
+                                             on_progress=on_progress, vector_store=self.vector_store)
+            indexed = [(doc_hash, name) for doc_hash, name, _ in new_documents if pipeline.stats.chunk_ids.get(doc_hash)]
+            if not indexed:
+                # Nothing was added to the store, the saved version is still current
+                return []
+            # Older copies go only once their replacements are indexed
+            names = {name for _, name in indexed}
+            for old_hash in [h for h, doc in self.documents.items() if doc["name"] in names]:
+                self._remove(old_hash)
+            for doc_hash, name in indexed:
+                self._record(doc_hash, name, pipeline.stats.chunk_ids[doc_hash], pipeline.stats.page_ranges[doc_hash])
+            self._save()
+            return [name for _, name in indexed]
+
+    def add_texts(self, name, doc_hash, texts, metadatas=None):
+        """Append already-split chunks of one document, for callers that don't use the pipeline."""
+        with self._writing():
+            if self.has_document(doc_hash) or not texts:
+                return False
+            self._load()
+            old_hashes = [h for h, doc in self.documents.items() if doc["name"] == name]
+            ids = [f"{doc_hash[:16]}-{i}" for i in range(len(texts))]
+            metadatas = metadatas or [{"source": name, "doc_hash": doc_hash} for _ in texts]
+            if self.vector_store is None:
+                self.vector_store = FAISS.from_texts(texts, self.embeddings, metadatas=metadatas, ids=ids)
+            else:
+                self.vector_store.add_texts(texts, metadatas=metadatas, ids=ids)
+            for old_hash in old_hashes:
+                self._remove(old_hash)
+            self._record(doc_hash, name, ids, None)
+            self._save()
+            return True
+
+    def remove_document(self, doc_hash):
+        with self._writing():
+            if not self.has_document(doc_hash):
+                return False
+            self._load()
+            self._remove(doc_hash)
+            self._save()
+            return True
+
+    def _record(self, doc_hash, name, ids, page_range):
+        self.manifest["documents"][doc_hash] = {
+            "name": name,
+            "chunk_ids": ids,
+            "pages": list(page_range) if page_range else None,
+        }
+
+    def _remove(self, doc_hash):
+        doc = self.manifest["documents"].pop(doc_hash)
+        if self.vector_store is None or not doc["chunk_ids"]:
+            return
+        if index_kind(self.vector_store.index) == "flat":
+            self.vector_store.delete(doc["chunk_ids"])
+        else:
+            # Trained indexes are rebuilt from the remaining chunks and retrained on save
+            self.vector_store = rebuild_without(self.vector_store, doc["chunk_ids"], self.embeddings)
+
+    def _save(self):
+        self.manifest["version"] += 1
+        if self.shared:
+            self.manifest["shared"] = True
+        os.makedirs(self.folder, exist_ok=True)
+        if self.documents and self.vector_store is not None:
+            report = maybe_convert(self.vector_store, self.index_config)
+            save_store(self.vector_store, self.folder, self.version, report)
+        else:
+            # Nothing left to search, drop the index files rather than saving an empty store
+            self.vector_store = None
+            remove_store(self.folder)
+        # Write the manifest last and atomically, it is what marks the new version as complete
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+        self._manifest_mtime = os.stat(self.manifest_path).st_mtime_ns
+        if self.registry is not None:
+            if self.vector_store is None:
+                self.registry.invalidate(self.folder)
+            else:
+                self.registry.put(self.folder, self.version, clone_store(self.vector_store, self.index_config))
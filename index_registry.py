@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_index_bytes(vector_store):
+    # Encoded vectors (float32 unless quantized) plus the chunk text when the docstore is in memory;
+    # the sqlite docstore of a memory-mapped store only holds the rows being read
+    index = vector_store.index
+    try:
+        code_size = index.sa_code_size()
+    except RuntimeError:
+        code_size = index.d * 4
+    docstore = getattr(vector_store.docstore, "_dict", {})
+    return index.ntotal * code_size + sum(len(doc.page_content) for doc in docstore.values())
+
+
+class IndexRegistry:
+    """Process-wide cache of loaded vector stores, keyed by collection.
+
+    Every entry remembers the index version it was loaded at; asking for a newer version reloads
+    it. Least recently used entries are evicted once the loaded indexes exceed ``max_bytes`` or
+    have sat unused for ``max_idle_seconds``. ``get`` returns ``None`` when the loader finds
+    nothing to load.
+    """
+
+    def __init__(self, loader, max_bytes=1024 * 1024 * 1024, max_idle_seconds=30 * 60):
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.max_idle_seconds = max_idle_seconds
+        self.loads = 0
+        self.hits = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["version"] == version:
+                entry["last_used"] = time.time()
+                self._entries.move_to_end(key)
+                self.hits += 1
+                # Questions alone never save anything, idle indexes have to be swept here too
+                self._evict(keep=key)
+                return entry["store"]
+        # Load outside the lock so one slow deserialization doesn't stall other collections
+        store = self.loader(key)
+        if store is None:
+            # Nothing saved in a format the loader reads
+            return None
+        self.loads += 1
+        self.put(key, version, store)
+        return store
+
+    def put(self, key, version, store):
+        with self._lock:
+            entry = self._entries.get(key)
+            # A concurrent load may already have published something newer
+            if entry is not None and entry["version"] > version:
+                return
+            self._entries[key] = {
+                "version": version,
+                "store": store,
+                "bytes": estimate_index_bytes(store),
+                "last_used": time.time(),
+            }
+            self._entries.move_to_end(key)
+            self._evict(keep=key)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _evict(self, keep):
+        now = time.time()
+        for key in [k for k, e in self._entries.items() if k != keep and now - e["last_used"] > self.max_idle_seconds]:
+            del self._entries[key]
+        total = sum(e["bytes"] for e in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self._entries.pop(key)["bytes"]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "indexes": len(self._entries),
+                "bytes": sum(e["bytes"] for e in self._entries.values()),
+                "hits": self.hits,
+                "loads": self.loads,
+            }
@@ -0,0 +1,291 @@
+import bisect
+import hashlib
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from PyPDF2 import PdfReader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.vectorstores import FAISS
+
+
+PAGES_PER_TASK = 8
+EMBED_BATCH_SIZE = 64
+QUEUE_SIZE = 4
+
+_END = object()
+
+
+def document_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# The pool functions below get the path of the spooled pdf instead of its bytes, and every worker
+# process parses a document once and keeps the reader for the tasks that follow
+_pool_readers = {}
+
+
+def _pool_reader(path, doc_hash):
+    reader = _pool_readers.get(doc_hash)
+    if reader is None:
+        # Documents are extracted one after another, only the current one is worth keeping
+        _pool_readers.clear()
+        reader = _pool_readers[doc_hash] = PdfReader(path)
+    return reader
+
+
+def _pool_count_pages(path, doc_hash):
+    return len(_pool_reader(path, doc_hash).pages)
+
+
+def _pool_extract_page_range(path, doc_hash, start, stop):
+    reader = _pool_reader(path, doc_hash)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _pool_context():
+    # Forking the multi-threaded app process (Streamlit, grpc) can deadlock the children
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class IngestStats:
+    def __init__(self):
+        self.documents = 0
+        self.total_pages = 0
+        self.pages = 0
+        self.chunks = 0
+        self.embedded = 0
+        self.bytes = 0
+        # Time spent in each stage (wall time for the extraction pool); stages overlap, so they add up to more than the run
+        self.extract_seconds = 0.0
+        self.split_seconds = 0.0
+        self.embed_seconds = 0.0
+        self.index_seconds = 0.0
+        # doc hash -> chunk ids and page range, so the index manager can remove a document later
+        self.chunk_ids = {}
+        self.page_ranges = {}
+        # Names of documents without any extractable text (e.g. scanned pages), nothing was indexed for them
+        self.empty_documents = []
+
+
+class _Failed:
+    def __init__(self, error):
+        self.error = error
+
+
+class IngestPipeline:
+    """Extract -> split -> embed pipeline for uploaded PDFs.
+
+    Pages are extracted in a process pool, split into chunks as they arrive and embedded in
+    fixed-size batches. The stages talk through bounded queues so only a few batches are ever
+    held in memory, no matter how large the course pack is.
+    """
+
+    def __init__(self, embeddings, chunk_size=10000, chunk_overlap=1000, batch_size=EMBED_BATCH_SIZE,
+                 workers=None, queue_size=QUEUE_SIZE):
+        self.embeddings = embeddings
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True)
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.stats = IngestStats()
+
+    def run(self, documents, on_progress=None, vector_store=None):
+        """Index ``documents`` (a list of ``(name, pdf_bytes)``) and return the FAISS store.
+
+        Chunks are appended to ``vector_store`` when one is given, otherwise a new store is built.
+
+        ``on_progress`` is called with the running ``IngestStats`` from the calling thread only,
+        so it is safe to update Streamlit widgets from it.
+        """
+        self.stats = IngestStats()
+        stop = threading.Event()
+        pages_q = queue.Queue(maxsize=self.workers * PAGES_PER_TASK * 2)
+        chunks_q = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            threading.Thread(target=self._extract, args=(documents, pages_q, stop), daemon=True),
+            threading.Thread(target=self._split, args=(pages_q, chunks_q, stop), daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                batch = chunks_q.get()
+                if batch is _END:
+                    break
+                if isinstance(batch, _Failed):
+                    raise batch.error
+                ids = [chunk_id for chunk_id, _, _ in batch]
+                texts = [text for _, text, _ in batch]
+                metadatas = [metadata for _, _, metadata in batch]
+                started = time.perf_counter()
+                vectors = self.embeddings.embed_documents(texts)
+                embedded = time.perf_counter()
+                if vector_store is None:
+                    vector_store = FAISS.from_embeddings(list(zip(texts, vectors)), self.embeddings, metadatas=metadatas, ids=ids)
+                else:
+                    vector_store.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+                self.stats.embed_seconds += embedded - started
+                self.stats.index_seconds += time.perf_counter() - embedded
+                self.stats.embedded += len(batch)
+                if on_progress:
+                    on_progress(self.stats)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        if on_progress:
+            on_progress(self.stats)
+        return vector_store
+
+    def _extract(self, documents, pages_q, stop):
+        started = time.perf_counter()
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context()) as pool:
+                for name, data in documents:
+                    doc_hash = document_hash(data)
+                    # Workers read the file themselves rather than getting the whole pdf with every page range
+                    fd, path = tempfile.mkstemp(suffix=".pdf")
+                    try:
+                        with os.fdopen(fd, "wb") as f:
+                            f.write(data)
+                        if not self._extract_document(pool, name, doc_hash, path, len(data), pages_q, stop, started):
+                            return
+                    finally:
+                        os.remove(path)
+            _put(pages_q, _END, stop)
+        except Exception as e:
+            _put(pages_q, _Failed(e), stop)
+
+    def _extract_document(self, pool, name, doc_hash, path, size, pages_q, stop, started):
+        page_count = pool.submit(_pool_count_pages, path, doc_hash).result()
+        self.stats.documents += 1
+        self.stats.bytes += size
+        self.stats.total_pages += page_count
+        # Keep a sliding window of page ranges in flight instead of submitting the whole file
+        ranges = deque((start, min(start + PAGES_PER_TASK, page_count))
+                       for start in range(0, page_count, PAGES_PER_TASK))
+        in_flight = deque()
+        try:
+            while ranges or in_flight:
+                while ranges and len(in_flight) < self.workers * 2:
+                    start, stop_page = ranges.popleft()
+                    in_flight.append((start, pool.submit(_pool_extract_page_range, path, doc_hash, start, stop_page)))
+                start, future = in_flight.popleft()
+                texts = future.result()
+                self.stats.extract_seconds = time.perf_counter() - started
+                for offset, text in enumerate(texts):
+                    if not _put(pages_q, (name, doc_hash, start + offset + 1, text), stop):
+                        return False
+                    self.stats.pages += 1
+        finally:
+            # The spooled file is removed next, so nothing may still be reading it
+            for _, future in in_flight:
+                future.cancel()
+            for _, future in in_flight:
+                if not future.cancelled():
+                    future.exception()
+        return _put(pages_q, (name, doc_hash, None, None), stop)
+
+    def _split(self, pages_q, chunks_q, stop):
+        try:
+            batch = []
+            buffer = ""
+            # (offset into buffer, page number) for every page that starts in the buffer
+            page_offsets = []
+            while True:
+                item = _get(pages_q, stop)
+                if item is None:
+                    return
+                if item is _END or isinstance(item, _Failed):
+                    break
+                name, doc_hash, page, text = item
+                if page is not None:
+                    page_offsets.append((len(buffer), page))
+                    buffer += text + "\n"
+                    # Hold back the last chunk, it may continue on the next page
+                    if len(buffer) < self.chunk_size * 2:
+                        continue
+                    split_started = time.perf_counter()
+                    chunks = self.splitter.create_documents([buffer])
+                    self.stats.split_seconds += time.perf_counter() - split_started
+                    if not chunks:
+                        buffer, page_offsets = "", []
+                        continue
+                    last = chunks.pop()
+                    chunks = [(chunk.page_content, self._page_range(page_offsets, chunk)) for chunk in chunks]
+                    start = last.metadata["start_index"]
+                    page_offsets = [(0, _page_at(page_offsets, start))] + [
+                        (offset - start, p) for offset, p in page_offsets if offset > start
+                    ]
+                    buffer = last.page_content
+                else:
+                    chunks = []
+                    if buffer.strip():
+                        split_started = time.perf_counter()
+                        chunks = [(chunk.page_content, self._page_range(page_offsets, chunk))
+                                  for chunk in self.splitter.create_documents([buffer])]
+                        self.stats.split_seconds += time.perf_counter() - split_started
+                    buffer = ""
+                    page_offsets = []
+                ids = self.stats.chunk_ids.setdefault(doc_hash, [])
+                for text, (first_page, last_page) in chunks:
+                    chunk_id = f"{doc_hash[:16]}-{len(ids)}"
+                    ids.append(chunk_id)
+                    first, last_seen = self.stats.page_ranges.get(doc_hash, (first_page, last_page))
+                    self.stats.page_ranges[doc_hash] = (min(first, first_page), max(last_seen, last_page))
+                    metadata = {"source": name, "doc_hash": doc_hash, "page_start": first_page, "page_end": last_page}
+                    batch.append((chunk_id, text, metadata))
+                    self.stats.chunks += 1
+                    if len(batch) == self.batch_size:
+                        if not _put(chunks_q, batch, stop):
+                            return
+                        batch = []
+                if page is None and not ids:
+                    self.stats.empty_documents.append(name)
+            if isinstance(item, _Failed):
+                _put(chunks_q, item, stop)
+                return
+            if batch and not _put(chunks_q, batch, stop):
+                return
+            _put(chunks_q, _END, stop)
+        except Exception as e:
+            _put(chunks_q, _Failed(e), stop)
+
+    @staticmethod
+    def _page_range(page_offsets, chunk):
+        start = chunk.metadata["start_index"]
+        return _page_at(page_offsets, start), _page_at(page_offsets, start + len(chunk.page_content) - 1)
+
+
+def _page_at(page_offsets, offset):
+    index = bisect.bisect_right([o for o, _ in page_offsets], offset) - 1
+    return page_offsets[max(index, 0)][1]
+
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return None
+
+
+def _put(q, item, stop):
+    # Blocking put that gives up once the pipeline is being torn down
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
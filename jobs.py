@@ -0,0 +1,169 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class JobQueue:
+    """Persistent queue of background jobs in sqlite, shared by the app and any number of workers.
+
+    A job is claimed by one worker at a time. Workers heartbeat the jobs they are running; a
+    running job whose heartbeat is older than ``stale_seconds`` belonged to a worker that died
+    and goes back to the queue, up to ``max_attempts`` times; from then on only the worker that
+    claimed it again can report on it. Jobs with the same ``key`` (the
+    collection an ingest writes to, the video being summarized) never run concurrently.
+    """
+
+    def __init__(self, path="jobs/jobs.sqlite", stale_seconds=60, max_attempts=3):
+        self.path = path
+        self.stale_seconds = stale_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Autocommit, claims use an explicit BEGIN IMMEDIATE so two processes can't take the same job
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                key TEXT,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progress TEXT,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                created REAL NOT NULL,
+                started REAL,
+                heartbeat REAL,
+                finished REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+            CREATE TABLE IF NOT EXISTS workers (
+                id TEXT PRIMARY KEY,
+                pid INTEGER NOT NULL,
+                started REAL NOT NULL,
+                heartbeat REAL NOT NULL
+            );
+            """
+        )
+
+    def submit(self, kind, payload, key=None):
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (kind, key, payload, status, created) VALUES (?, ?, ?, 'queued', ?)",
+                (kind, key, json.dumps(payload), time.time()),
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker_id, kinds=None):
+        """Mark the oldest runnable job as running for ``worker_id`` and return it, or ``None``."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_stale(now)
+                rows = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status='queued' AND (key IS NULL OR key NOT IN "
+                    "(SELECT key FROM jobs WHERE status='running' AND key IS NOT NULL)) ORDER BY id"
+                ).fetchall()
+                job = next((j for j in map(self._job, rows) if kinds is None or j["kind"] in kinds), None)
+                if job is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status='running', worker=?, attempts=attempts+1, started=?, heartbeat=?, error=NULL WHERE id=?",
+                        (worker_id, now, now, job["id"]),
+                    )
+                    job.update(status="running", worker=worker_id, attempts=job["attempts"] + 1)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job
+
+    def _requeue_stale(self, now):
+        # Jobs of a dead worker resume from the start; the handlers skip work that already finished
+        stale = now - self.stale_seconds
+        self._conn.execute(
+            "UPDATE jobs SET status='failed', error='Worker stopped responding', finished=? "
+            "WHERE status='running' AND heartbeat < ? AND attempts >= ?",
+            (now, stale, self.max_attempts),
+        )
+        self._conn.execute(
+            "UPDATE jobs SET status='queued', worker=NULL WHERE status='running' AND heartbeat < ?",
+            (stale,),
+        )
+
+    def heartbeat(self, worker_id, job_ids):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO workers VALUES (?, ?, COALESCE((SELECT started FROM workers WHERE id=?), ?), ?)",
+                               (worker_id, os.getpid(), worker_id, now, now))
+            self._conn.executemany("UPDATE jobs SET heartbeat=? WHERE id=? AND worker=?",
+                                   [(now, job_id, worker_id) for job_id in job_ids])
+
+    def remove_worker(self, worker_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM workers WHERE id=?", (worker_id,))
+
+    def active_workers(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM workers WHERE heartbeat >= ?",
+                                      (time.time() - self.stale_seconds,)).fetchone()[0]
+
+    def update_progress(self, job_id, worker_id, progress):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET progress=?, heartbeat=? WHERE id=? AND worker=? AND status='running'",
+                               (json.dumps(progress), time.time(), job_id, worker_id))
+
+    def complete(self, job_id, worker_id, result):
+        """Mark the job done, returns False if ``worker_id`` no longer holds it."""
+        return self._finish(job_id, worker_id, "done", result=json.dumps(result))
+
+    def fail(self, job_id, worker_id, error):
+        return self._finish(job_id, worker_id, "failed", error=error)
+
+    def _finish(self, job_id, worker_id, status, result=None, error=None):
+        # A worker whose job was requeued as stale must not finish it under the worker that has it now
+        with self._lock:
+            cursor = self._conn.execute("UPDATE jobs SET status=?, result=?, error=?, finished=? WHERE id=? AND worker=? AND status='running'",
+                                        (status, result, error, time.time(), job_id, worker_id))
+            return cursor.rowcount == 1
+
+    def retry(self, job_id):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status='queued', attempts=0, worker=NULL, error=NULL, finished=NULL "
+                               "WHERE id=? AND status='failed'", (job_id,))
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        return None if row is None else self._job(row)
+
+    def recent(self, kind=None, limit=20):
+        with self._lock:
+            if kind is None:
+                rows = self._conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+            else:
+                rows = self._conn.execute("SELECT * FROM jobs WHERE kind=? ORDER BY id DESC LIMIT ?", (kind, limit)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def pending(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            counts = {row[0]: row[1] for row in self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")}
+        return {status: counts.get(status, 0) for status in ("queued", "running", "done", "failed")}
+
+    def _job(self, row):
+        job = dict(row)
+        for field in ("payload", "progress", "result"):
+            if job[field] is not None:
+                job[field] = json.loads(job[field])
+        return job
@@ -0,0 +1,106 @@
+import hashlib
+import time
+
+from summarizer import estimate_tokens
+
+
+class Retriever:
+    """Picks the context for a question within a token budget.
+
+    Candidates come from max-marginal-relevance search (or plain similarity with an optional
+    distance cut-off), duplicates and the overlap between neighbouring chunks are removed, and
+    the most relevant chunks are packed until ``token_budget`` is used up. ``last_report`` holds
+    the timing and size of the latest retrieval.
+    """
+
+    def __init__(self, token_budget=3000, fetch_k=20, k=8, search_type="mmr", lambda_mult=0.5,
+                 max_distance=None):
+        self.token_budget = token_budget
+        self.fetch_k = fetch_k
+        self.k = k
+        self.search_type = search_type
+        self.lambda_mult = lambda_mult
+        self.max_distance = max_distance
+        self.last_report = {}
+
+    def retrieve(self, vector_store, question, embedding=None):
+        started = time.perf_counter()
+        # Callers that already embedded the question (e.g. for the answer cache) pass it in
+        if embedding is None:
+            embedding = vector_store.embedding_function.embed_query(question)
+        embedded = time.perf_counter()
+        if self.search_type == "mmr":
+            candidates = vector_store.max_marginal_relevance_search_with_score_by_vector(
+                embedding, k=self.k, fetch_k=self.fetch_k, lambda_mult=self.lambda_mult
+            )
+        else:
+            candidates = vector_store.similarity_search_with_score_by_vector(embedding, k=self.k)
+        # FAISS scores are L2 distances, lower is closer
+        if self.max_distance is not None:
+            candidates = [(doc, score) for doc, score in candidates if score <= self.max_distance]
+        docs = pack_context(dedupe_chunks([doc for doc, _ in candidates]), self.token_budget)
+        self.last_report = {
+            "embed_seconds": embedded - started,
+            "search_seconds": time.perf_counter() - embedded,
+            "retrieval_seconds": time.perf_counter() - started,
+            "candidates": len(candidates),
+            "selected": len(docs),
+            "context_tokens": sum(estimate_tokens(doc.page_content) for doc in docs),
+            "token_budget": self.token_budget,
+        }
+        return docs
+
+
+def dedupe_chunks(docs, min_overlap=50):
+    """Drop repeated chunks and trim text a chunk shares with the end of an earlier one."""
+    kept = []
+    seen = set()
+    for doc in docs:
+        text = doc.page_content
+        digest = hashlib.sha256(" ".join(text.split()).encode("utf-8")).digest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        for earlier in kept:
+            if text in earlier.page_content:
+                text = ""
+                break
+            # Neighbouring chunks share ``chunk_overlap`` characters at whichever end they touch
+            overlap = _overlap(earlier.page_content, text, min_overlap)
+            if overlap:
+                text = text[overlap:]
+            overlap = _overlap(text, earlier.page_content, min_overlap)
+            if overlap:
+                text = text[:-overlap]
+        if not text.strip():
+            continue
+        if text != doc.page_content:
+            doc = doc.__class__(page_content=text, metadata=dict(doc.metadata))
+        kept.append(doc)
+    return kept
+
+
+def _overlap(first, second, min_overlap):
+    # Length of the longest suffix of ``first`` that is also a prefix of ``second``
+    probe = second[:min_overlap]
+    if len(probe) < min_overlap:
+        return 0
+    position = first.find(probe)
+    while position != -1:
+        if second.startswith(first[position:]):
+            return len(first) - position
+        position = first.find(probe, position + 1)
+    return 0
+
+
+def pack_context(docs, token_budget):
+    # Docs are in relevance order, take each one that still fits
+    packed = []
+    used = 0
+    for doc in docs:
+        tokens = estimate_tokens(doc.page_content)
+        if used + tokens > token_budget:
+            continue
+        packed.append(doc)
+        used += tokens
+    return packed
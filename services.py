@@ -0,0 +1,122 @@
+"""Settings and model clients shared by the Streamlit app and the background worker.
+
+Both processes have to embed, chunk, index and summarize the same way, otherwise an index or
+notes written by the worker would not match what the app looks up.
+"""
+import json
+import os
+import re
+
+import google.generativeai as genai
+from dotenv import load_dotenv
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from youtube_transcript_api import YouTubeTranscriptApi
+
+from embedding_cache import CachedEmbeddings
+from embedding_executor import BatchedEmbeddings
+from fake_models import FakeEmbeddings
+from index_backend import IndexConfig
+from ingest import IngestPipeline
+from summarizer import TranscriptSummarizer
+
+load_dotenv()
+
+EMBEDDING_MODEL = "models/embedding-001"
+# Set EMBEDDING_BACKEND=fake to run ingest and search offline with deterministic local vectors
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "google")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_REQUESTS_PER_SECOND = float(os.getenv("EMBED_REQUESTS_PER_SECOND", "5"))
+EMBEDDING_CACHE_PATH = "embedding_cache/embeddings.sqlite"
+
+INDEX_ROOT = "faiss_index"
+# flat, ivf, ivfpq or hnsw; collections switch from flat once they have INDEX_MIN_TRAIN chunks to train on
+INDEX_CONFIG = IndexConfig(
+    kind=os.getenv("INDEX_TYPE", "flat"),
+    nprobe=int(os.getenv("INDEX_NPROBE", "8")),
+    pq_m=int(os.getenv("INDEX_PQ_M", "16")),
+    min_train=int(os.getenv("INDEX_MIN_TRAIN", "2000")),
+)
+
+# Small chunks let retrieval pick just the relevant passages instead of ~10k characters at a time
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1500"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "150"))
+
+# Transcripts longer than one segment are summarized map-reduce style
+SUMMARY_SEGMENT_TOKENS = int(os.getenv("SUMMARY_SEGMENT_TOKENS", "8000"))
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "4"))
+SUMMARY_MODEL = "gemini-pro"
+SUMMARY_CACHE_PATH = "summary_cache/summaries.sqlite"
+
+JOBS_PATH = "jobs/jobs.sqlite"
+UPLOADS_ROOT = "jobs/uploads"
+
+
+def configure_genai():
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+
+
+def make_document_embeddings(cache):
+    if EMBEDDING_BACKEND == "fake":
+        client, model = FakeEmbeddings(), "fake"
+    else:
+        client, model = GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL), EMBEDDING_MODEL
+    # Cache misses go out in rate-limited concurrent batches, retrying only the batches that failed
+    batched = BatchedEmbeddings(client, batch_size=EMBED_BATCH_SIZE, max_concurrency=EMBED_CONCURRENCY, requests_per_second=EMBED_REQUESTS_PER_SECOND)
+    return CachedEmbeddings(batched, cache, model)
+
+
+def make_ingest_pipeline(embeddings):
+    # One pipeline batch keeps every concurrent embedding request busy
+    return IngestPipeline(embeddings, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, batch_size=EMBED_BATCH_SIZE * EMBED_CONCURRENCY)
+
+
+def make_summarizer():
+    model = genai.GenerativeModel(SUMMARY_MODEL)
+    # Long lectures are summarized segment by segment in parallel, then merged with the subject prompt
+    return TranscriptSummarizer(
+        lambda text: model.generate_content(text).text,
+        max_segment_tokens=SUMMARY_SEGMENT_TOKENS,
+        max_workers=SUMMARY_WORKERS,
+        generate_stream=lambda text: (chunk.text for chunk in model.generate_content(text, stream=True)),
+    )
+
+
+def fetch_transcript(video_id, cache):
+    # Caption entries ({"text", "start", "duration"}) so summaries keep timestamps
+    entries = cache.get_transcript(video_id)
+    if entries is None:
+        entries = YouTubeTranscriptApi.get_transcript(video_id)
+        cache.put_transcript(video_id, entries)
+    return entries
+
+
+def video_id_from_url(url):
+    # Accepts a bare id, a watch?v= url (with or without extra parameters) or a youtu.be link
+    url = url.strip()
+    match = re.search(r"(?:v=|youtu\.be/)([\w-]+)", url)
+    return match.group(1) if match else url
+
+
+def collection_name_ok(name):
+    return bool(re.fullmatch(r"[\w-]+", name))
+
+
+def list_collections():
+    """Shared collections under ``INDEX_ROOT`` (the ones built with worker.py), most recently changed first.
+
+    Each app session's own collection is private to it and never listed here.
+    """
+    if not os.path.isdir(INDEX_ROOT):
+        return []
+    manifests = []
+    for name in os.listdir(INDEX_ROOT):
+        path = os.path.join(INDEX_ROOT, name, "manifest.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                shared = json.load(f).get("shared", False)
+        except (OSError, ValueError):
+            continue
+        if shared:
+            manifests.append((os.path.getmtime(path), name))
+    return [name for _, name in sorted(manifests, reverse=True)]
@@ -0,0 +1,39 @@
+import time
+
+
+class RequestTimer:
+    """Time-to-first-token and end-to-end latency of one generation request."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.first_token = None
+        self.finished = None
+        self.chunks = 0
+        self.characters = 0
+
+    @property
+    def ttft(self):
+        return None if self.first_token is None else self.first_token - self.started
+
+    @property
+    def total(self):
+        return None if self.finished is None else self.finished - self.started
+
+
+def timed_stream(chunks, timer):
+    """Pass text chunks through unchanged while recording ``timer``, e.g. for ``st.write_stream``.
+
+    The pages add the timings to the request's telemetry trace.
+    """
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if timer.first_token is None:
+                timer.first_token = time.perf_counter()
+            timer.chunks += 1
+            timer.characters += len(chunk)
+            yield chunk
+    finally:
+        timer.finished = time.perf_counter()
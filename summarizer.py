@@ -0,0 +1,137 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Rough token count, Gemini averages about four characters of English per token
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+SEGMENT_PROMPT = """
+    You are taking notes on one part of a longer lecture video, from {start} to {end}.
+    Write thorough notes on everything covered in this part: concepts, definitions, formulas, code,
+    examples and any questions answered. Keep the timestamps of the main topics. These notes will be
+    merged with the notes of the other parts, so do not write an introduction or a conclusion.
+
+    Transcript part:
+"""
+
+COLLAPSE_PROMPT = """
+    Merge the following partial notes of consecutive parts of one lecture video into a single set of
+    notes. Keep every concept, formula, code sample and timestamp, only remove repetition.
+
+    Partial notes:
+"""
+
+REDUCE_PREFIX = """
+
+Notes taken on consecutive parts of the video (with timestamps), use them as the transcript:
+"""
+
+
+def segment_transcript(entries, max_tokens=6000, marker_every=60):
+    """Split transcript ``entries`` (``{"text", "start", "duration"}``) into token-budgeted segments.
+
+    Segments break between caption lines and carry their start/end time, with a timestamp marker
+    inserted roughly every ``marker_every`` seconds so the notes can point back into the video.
+    """
+    segments = []
+    parts = []
+    tokens = 0
+    start = None
+    next_marker = 0.0
+    end = 0.0
+    for entry in entries:
+        text = entry["text"].strip()
+        if not text:
+            continue
+        piece = text
+        if entry["start"] >= next_marker:
+            piece = f"[{format_timestamp(entry['start'])}] {text}"
+            next_marker = entry["start"] + marker_every
+        piece_tokens = estimate_tokens(piece)
+        if parts and tokens + piece_tokens > max_tokens:
+            segments.append({"start": start, "end": end, "text": " ".join(parts)})
+            parts, tokens, start = [], 0, None
+            # Every segment opens with its own timestamp
+            piece = f"[{format_timestamp(entry['start'])}] {text}"
+            next_marker = entry["start"] + marker_every
+            piece_tokens = estimate_tokens(piece)
+        if start is None:
+            start = entry["start"]
+        parts.append(piece)
+        tokens += piece_tokens
+        end = entry["start"] + entry.get("duration", 0.0)
+    if parts:
+        segments.append({"start": start, "end": end, "text": " ".join(parts)})
+    return segments
+
+
+class TranscriptSummarizer:
+    """Map-reduce notes for transcripts that are too long for a single request.
+
+    ``generate`` is any ``prompt -> text`` callable. Segments are summarized concurrently on a
+    bounded pool, then the partial notes are merged with the subject prompt, collapsing them in
+    rounds first if they still don't fit the budget. Short transcripts take a single request, as
+    before. ``generate_stream`` (``prompt -> iterator of text``) is used for the final request by
+    ``summarize_stream``.
+    """
+
+    def __init__(self, generate, max_segment_tokens=6000, max_workers=4, generate_stream=None):
+        self.generate = generate
+        self.generate_stream = generate_stream
+        self.max_segment_tokens = max_segment_tokens
+        self.max_workers = max_workers
+        self.segments = 0
+
+    def summarize(self, entries, subject_prompt):
+        prompt = self._final_prompt(entries, subject_prompt)
+        return self.generate(prompt) if prompt else ""
+
+    def summarize_stream(self, entries, subject_prompt):
+        # The segment notes are needed in full before merging, so only the final request streams
+        prompt = self._final_prompt(entries, subject_prompt)
+        if prompt:
+            yield from self.generate_stream(prompt)
+
+    def _final_prompt(self, entries, subject_prompt):
+        segments = segment_transcript(entries, self.max_segment_tokens)
+        self.segments = len(segments)
+        if not segments:
+            return None
+        if len(segments) == 1:
+            return subject_prompt + segments[0]["text"]
+
+        prompts = [
+            SEGMENT_PROMPT.format(start=format_timestamp(s["start"]), end=format_timestamp(s["end"])) + s["text"]
+            for s in segments
+        ]
+        notes = self._map(prompts)
+        notes = [
+            f"[{format_timestamp(s['start'])} - {format_timestamp(s['end'])}]\n{note}"
+            for s, note in zip(segments, notes)
+        ]
+        while len(notes) > 1 and estimate_tokens("\n\n".join(notes)) > self.max_segment_tokens:
+            notes = self._collapse(notes)
+        return subject_prompt + REDUCE_PREFIX + "\n\n".join(notes)
+
+    def _map(self, prompts):
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(prompts))) as pool:
+            return list(pool.map(self.generate, prompts))
+
+    def _collapse(self, notes):
+        # Merge neighbouring notes into groups that fit the budget, always at least two per group
+        groups = [[]]
+        for note in notes:
+            group = groups[-1]
+            if len(group) >= 2 and estimate_tokens("\n\n".join(group + [note])) > self.max_segment_tokens:
+                groups.append([note])
+            else:
+                group.append(note)
+        merged = self._map([COLLAPSE_PROMPT + "\n\n".join(group) for group in groups if len(group) > 1])
+        merged.reverse()
+        return [merged.pop() if len(group) > 1 else group[0] for group in groups]
@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Trace:
+    """Stage timings and counters of one request (an upload, a question or a summary)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self._clock = time.perf_counter()
+        self.seconds = None
+        self.spans = []
+        self.counters = {}
+        self.error = None
+
+    @contextmanager
+    def span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, time.perf_counter() - started)
+
+    def add_span(self, name, seconds):
+        # For stages timed elsewhere, e.g. inside the ingest pipeline threads
+        self.spans.append({"name": name, "seconds": seconds})
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def as_dict(self):
+        return {"request": self.name, "started": self.started, "seconds": self.seconds,
+                "spans": self.spans, "counters": self.counters, "error": self.error}
+
+
+class Telemetry:
+    """Collects traces into a JSON-lines log and Prometheus text metrics.
+
+    Every finished trace is appended to ``traces.jsonl`` and the aggregated metrics are rewritten
+    to ``metrics.prom`` (node exporter textfile format) in ``folder``. ``serve`` additionally
+    exposes them over HTTP at ``/metrics``.
+    """
+
+    def __init__(self, folder="telemetry", keep=200):
+        self.folder = folder
+        self.log_path = os.path.join(folder, "traces.jsonl")
+        self.metrics_path = os.path.join(folder, "metrics.prom")
+        self.traces = deque(maxlen=keep)
+        # (request, stage) -> [count, sum of seconds]
+        self._stages = {}
+        self._requests = {}
+        self._counters = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+        self._server = None
+        os.makedirs(folder, exist_ok=True)
+
+    @contextmanager
+    def trace(self, name):
+        trace = Trace(name)
+        try:
+            yield trace
+        except Exception as e:
+            trace.error = repr(e)
+            raise
+        finally:
+            trace.seconds = time.perf_counter() - trace._clock
+            self.record(trace)
+
+    def record(self, trace):
+        with self._lock:
+            self.traces.append(trace)
+            for span in trace.spans:
+                stage = self._stages.setdefault((trace.name, span["name"]), [0, 0.0])
+                stage[0] += 1
+                stage[1] += span["seconds"]
+            request = self._requests.setdefault(trace.name, [0, 0.0])
+            request[0] += 1
+            request[1] += trace.seconds
+            for counter, value in trace.counters.items():
+                self._counters[(trace.name, counter)] = self._counters.get((trace.name, counter), 0) + value
+            if trace.error:
+                self._errors[trace.name] = self._errors.get(trace.name, 0) + 1
+            metrics = self._render()
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(trace.as_dict()) + "\n")
+            tmp_path = self.metrics_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(metrics)
+            os.replace(tmp_path, self.metrics_path)
+
+    def recent(self, name=None):
+        with self._lock:
+            return [t for t in self.traces if name is None or t.name == name]
+
+    def render_prometheus(self):
+        with self._lock:
+            return self._render()
+
+    def _render(self):
+        lines = [
+            "# HELP notewise_request_seconds Wall time of a request.",
+            "# TYPE notewise_request_seconds summary",
+        ]
+        for request, (count, total) in sorted(self._requests.items()):
+            lines.append(f'notewise_request_seconds_count{{request="{request}"}} {count}')
+            lines.append(f'notewise_request_seconds_sum{{request="{request}"}} {total:.6f}')
+        lines += ["# HELP notewise_stage_seconds Time spent in one stage of a request.",
+                  "# TYPE notewise_stage_seconds summary"]
+        for (request, stage), (count, total) in sorted(self._stages.items()):
+            lines.append(f'notewise_stage_seconds_count{{request="{request}",stage="{stage}"}} {count}')
+            lines.append(f'notewise_stage_seconds_sum{{request="{request}",stage="{stage}"}} {total:.6f}')
+        lines += ["# HELP notewise_events_total Bytes, pages, chunks, tokens and cache hits counted per request.",
+                  "# TYPE notewise_events_total counter"]
+        for (request, counter), value in sorted(self._counters.items()):
+            lines.append(f'notewise_events_total{{request="{request}",event="{counter}"}} {value}')
+        lines += ["# HELP notewise_request_errors_total Requests that raised.",
+                  "# TYPE notewise_request_errors_total counter"]
+        for request, value in sorted(self._errors.items()):
+            lines.append(f'notewise_request_errors_total{{request="{request}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve ``/metrics`` from a background thread, once per process."""
+        if self._server is not None:
+            return self._server
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
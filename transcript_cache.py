@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def prompt_hash(prompt):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class TranscriptCache:
+    """sqlite store of YouTube transcripts and the notes generated from them.
+
+    Transcripts are keyed by video id, notes by (video id, subject, prompt hash, model) so
+    editing a subject prompt or switching models never serves stale notes. Entries expire after
+    ``ttl_seconds`` and the least recently used are dropped once both tables together exceed
+    ``max_bytes``.
+    """
+
+    def __init__(self, path="summary_cache/summaries.sqlite", max_bytes=512 * 1024 * 1024,
+                 ttl_seconds=30 * 24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = {"transcript": 0, "notes": 0}
+        self.misses = {"transcript": 0, "notes": 0}
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS transcripts (
+                video_id TEXT PRIMARY KEY,
+                entries TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS notes (
+                video_id TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                text TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (video_id, subject, prompt_hash, model)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def get_transcript(self, video_id):
+        row = self._get("transcript", "SELECT entries, created FROM transcripts WHERE video_id=?", (video_id,),
+                        "UPDATE transcripts SET last_used=? WHERE video_id=?", "DELETE FROM transcripts WHERE video_id=?")
+        return None if row is None else json.loads(row)
+
+    def put_transcript(self, video_id, entries):
+        data = json.dumps(entries)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO transcripts VALUES (?, ?, ?, ?, ?)",
+                               (video_id, data, len(data.encode("utf-8")), now, now))
+            self._evict()
+            self._conn.commit()
+
+    def get_notes(self, video_id, subject, prompt, model):
+        key = (video_id, subject, prompt_hash(prompt), model)
+        where = "video_id=? AND subject=? AND prompt_hash=? AND model=?"
+        return self._get("notes", f"SELECT text, created FROM notes WHERE {where}", key,
+                         f"UPDATE notes SET last_used=? WHERE {where}", f"DELETE FROM notes WHERE {where}")
+
+    def put_notes(self, video_id, subject, prompt, model, text):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO notes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               (video_id, subject, prompt_hash(prompt), model, text, len(text.encode("utf-8")), now, now))
+            self._evict()
+            self._conn.commit()
+
+    def _get(self, kind, select, key, touch, delete):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(select, key).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute(delete, key)
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses[kind] += 1
+                return None
+            self._conn.execute(touch, (now, *key))
+            self._conn.commit()
+            self.hits[kind] += 1
+            return row[0]
+
+    def _evict(self):
+        expired = time.time() - self.ttl_seconds
+        self._conn.execute("DELETE FROM transcripts WHERE created < ?", (expired,))
+        self._conn.execute("DELETE FROM notes WHERE created < ?", (expired,))
+        total = self._bytes()
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            """SELECT 'transcripts', rowid, size, last_used FROM transcripts
+               UNION ALL SELECT 'notes', rowid, size, last_used FROM notes
+               ORDER BY last_used ASC"""
+        ).fetchall()
+        for table, rowid, size, _ in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute(f"DELETE FROM {table} WHERE rowid=?", (rowid,))
+            total -= size
+
+    def _bytes(self):
+        return sum(self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+                   for table in ("transcripts", "notes"))
+
+    def stats(self):
+        with self._lock:
+            transcripts = self._conn.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0]
+            notes = self._conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+            size = self._bytes()
+        hits = sum(self.hits.values())
+        lookups = hits + sum(self.misses.values())
+        return {
+            "hits": hits,
+            "misses": lookups - hits,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "notes_hits": self.hits["notes"],
+            "transcript_hits": self.hits["transcript"],
+            "transcripts": transcripts,
+            "notes": notes,
+            "bytes": size,
+        }
@@ -0,0 +1,283 @@
+"""Background ingestion and summarization, outside the Streamlit rerun loop.
+
+Jobs live in a sqlite queue (jobs/jobs.sqlite) so they survive restarts: a job that was
+running when its worker died is picked up again and skips whatever it had already finished.
+Indexes and notes are written where the app reads them, so they show up there right away.
+
+    python worker.py ingest lectures/ --collection semester-1
+    python worker.py summarize VIDEO_ID_OR_URL ... --subject CS
+    python worker.py summarize --file playlist.txt --subject Mathematics
+    python worker.py work --workers 2
+    python worker.py status
+"""
+import argparse
+import glob
+import os
+import shutil
+import socket
+import sys
+import threading
+import time
+import uuid
+
+from embedding_cache import EmbeddingCache
+from index_manager import IndexManager
+from jobs import JobQueue
+from prompts import SUBJECTS, get_subject_prompt
+from services import (EMBEDDING_CACHE_PATH, INDEX_CONFIG, INDEX_ROOT, JOBS_PATH, SUMMARY_CACHE_PATH, SUMMARY_MODEL,
+                      collection_name_ok, configure_genai, fetch_transcript, make_document_embeddings, make_ingest_pipeline,
+                      make_summarizer, video_id_from_url)
+from telemetry import Telemetry
+from transcript_cache import TranscriptCache
+
+# PDFs handed to one pipeline run; the index is saved after each, so an interrupted job loses at most this many
+INGEST_FILES_PER_SAVE = int(os.getenv("INGEST_FILES_PER_SAVE", "8"))
+
+
+def submit_ingest(queue, collection, paths, cleanup=False, shared=False):
+    # Jobs on one collection run one at a time, they all write the same index.
+    # Shared collections are listed in every app session, the app's own uploads are not
+    return queue.submit("ingest", {"collection": collection, "paths": paths, "cleanup": cleanup, "shared": shared},
+                        key=f"collection:{collection}")
+
+
+def submit_summary(queue, video_id, subject):
+    return queue.submit("summarize", {"video_id": video_id, "subject": subject}, key=f"video:{video_id}:{subject}")
+
+
+def pdf_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, "**", "*.pdf"), recursive=True))
+        else:
+            files.append(path)
+    return files
+
+
+class Throttle:
+    """Calls ``report`` at most every ``seconds``, progress callbacks can fire once per chunk batch."""
+
+    def __init__(self, report, seconds=1.0):
+        self.report = report
+        self.seconds = seconds
+        self._last = 0.0
+
+    def __call__(self, progress, force=False):
+        now = time.monotonic()
+        if force or now - self._last >= self.seconds:
+            self._last = now
+            self.report(progress)
+
+
+class JobHandlers:
+    """What each kind of job does. Every handler is safe to re-run after an interruption."""
+
+    def __init__(self, telemetry=None):
+        self.telemetry = telemetry or Telemetry(os.path.join("telemetry", "worker"))
+        self.embeddings = make_document_embeddings(EmbeddingCache(EMBEDDING_CACHE_PATH))
+        self.transcripts = TranscriptCache(SUMMARY_CACHE_PATH)
+
+    def __call__(self, job, report):
+        return getattr(self, job["kind"])(job["payload"], report)
+
+    def ingest(self, payload, report):
+        folder = os.path.join(INDEX_ROOT, payload["collection"])
+        manager = IndexManager(folder, self.embeddings, index_config=INDEX_CONFIG, shared=payload.get("shared", False))
+        files = pdf_files(payload["paths"])
+        progress = {"files": len(files), "files_done": 0, "indexed": 0, "pages": 0, "chunks": 0}
+        report(progress, force=True)
+        with self.telemetry.trace("ingest") as trace:
+            for start in range(0, len(files), INGEST_FILES_PER_SAVE):
+                batch = files[start:start + INGEST_FILES_PER_SAVE]
+                documents = []
+                for path in batch:
+                    with open(path, "rb") as f:
+                        documents.append((os.path.basename(path), f.read()))
+                pipeline = make_ingest_pipeline(self.embeddings)
+
+                def on_progress(stats):
+                    report(dict(progress, batch_pages=stats.pages, batch_chunks=stats.chunks, batch_embedded=stats.embedded))
+
+                # Files indexed before an interruption have the same hash and are skipped
+                indexed = manager.add_documents(documents, pipeline, on_progress=on_progress)
+                stats = pipeline.stats
+                for stage in ("extract", "split", "embed", "index"):
+                    trace.add_span(stage, getattr(stats, f"{stage}_seconds"))
+                trace.count("bytes", stats.bytes)
+                trace.count("pages", stats.pages)
+                trace.count("chunks", stats.chunks)
+                progress.update(files_done=progress["files_done"] + len(batch), indexed=progress["indexed"] + len(indexed),
+                                pages=progress["pages"] + stats.pages, chunks=progress["chunks"] + stats.chunks)
+                report(progress, force=True)
+        if payload.get("cleanup"):
+            # Uploads spooled by the app are only needed until they are indexed
+            for path in payload["paths"]:
+                shutil.rmtree(path, ignore_errors=True)
+        return dict(progress, version=manager.version)
+
+    def summarize(self, payload, report):
+        video_id, subject = payload["video_id"], payload["subject"]
+        prompt = get_subject_prompt(subject)
+        with self.telemetry.trace("summary") as trace:
+            if self.transcripts.get_notes(video_id, subject, prompt, SUMMARY_MODEL) is not None:
+                trace.count("notes_cache_hits")
+                return {"cached": True}
+            report({"stage": "transcript"}, force=True)
+            with trace.span("transcript"):
+                entries = fetch_transcript(video_id, self.transcripts)
+            report({"stage": "summarizing", "entries": len(entries)}, force=True)
+            summarizer = make_summarizer()
+            with trace.span("llm"):
+                notes = summarizer.summarize(entries, prompt)
+            trace.count("segments", summarizer.segments)
+            # Cached empty notes would be served as the summary from then on
+            if not notes:
+                raise ValueError(f"No notes generated for {video_id}, the transcript is empty")
+            self.transcripts.put_notes(video_id, subject, prompt, SUMMARY_MODEL, notes)
+        return {"cached": False, "segments": summarizer.segments, "characters": len(notes)}
+
+
+class Worker:
+    """Runs ``workers`` jobs at a time from ``queue`` until stopped.
+
+    With ``idle_exit`` the worker stops once the queue has had nothing for it for that many
+    seconds, which is how the app runs it on demand.
+    """
+
+    def __init__(self, queue, handler, workers=2, poll_seconds=1.0, heartbeat_seconds=10.0, idle_exit=None):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.idle_exit = idle_exit
+        self.id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.running = set()
+        self._last_busy = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run(self):
+        self.queue.heartbeat(self.id, [])
+        beat = threading.Thread(target=self._heartbeat, daemon=True)
+        beat.start()
+        threads = [threading.Thread(target=self._loop, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            # Running jobs stay marked running and are requeued once their heartbeat goes stale
+            print("Stopping, interrupted jobs resume on the next run", file=sys.stderr)
+        finally:
+            self._stop.set()
+            self.queue.remove_worker(self.id)
+
+    def stop(self):
+        self._stop.set()
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.heartbeat_seconds):
+            with self._lock:
+                running = list(self.running)
+            self.queue.heartbeat(self.id, running)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            job = self.queue.claim(self.id)
+            if job is None:
+                if self.idle_exit is not None:
+                    with self._lock:
+                        if not self.running and time.monotonic() - self._last_busy > self.idle_exit:
+                            return
+                self._stop.wait(self.poll_seconds)
+                continue
+            with self._lock:
+                self.running.add(job["id"])
+            print(f"Job {job['id']} {job['kind']} started (attempt {job['attempts']})", file=sys.stderr)
+            report = Throttle(lambda progress: self.queue.update_progress(job["id"], self.id, progress))
+            try:
+                result = self.handler(job, report)
+            except Exception as e:
+                print(f"Job {job['id']} failed: {e!r}", file=sys.stderr)
+                finished = self.queue.fail(job["id"], self.id, repr(e))
+            else:
+                print(f"Job {job['id']} done", file=sys.stderr)
+                finished = self.queue.complete(job["id"], self.id, result)
+            finally:
+                with self._lock:
+                    self.running.discard(job["id"])
+                    self._last_busy = time.monotonic()
+            if not finished:
+                print(f"Job {job['id']} was handed to another worker meanwhile, leaving it to that one", file=sys.stderr)
+
+
+def print_jobs(jobs):
+    for job in jobs:
+        detail = job["error"] or job["result"] or job["progress"] or job["payload"]
+        print(f"{job['id']:>5}  {job['kind']:<10} {job['status']:<8} {detail}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", default=JOBS_PATH, help="job queue database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="queue PDFs (files or directories) for indexing into a collection")
+    ingest.add_argument("paths", nargs="+")
+    ingest.add_argument("--collection", required=True, help="collection name, shown in the app's collection list")
+
+    summarize = commands.add_parser("summarize", help="queue YouTube videos for notes")
+    summarize.add_argument("videos", nargs="*", help="video ids or urls")
+    summarize.add_argument("--file", help="text file with one video id or url per line")
+    summarize.add_argument("--subject", default=SUBJECTS[0], choices=SUBJECTS)
+
+    work = commands.add_parser("work", help="process queued jobs")
+    work.add_argument("--workers", type=int, default=int(os.getenv("JOB_WORKERS", "2")), help="jobs run at the same time")
+    work.add_argument("--exit-when-idle", type=float, metavar="SECONDS", help="stop after the queue has been empty this long")
+
+    status = commands.add_parser("status", help="show recent jobs")
+    status.add_argument("job_id", nargs="?", type=int)
+    status.add_argument("--retry", action="store_true", help="queue a failed job again")
+
+    args = parser.parse_args(argv)
+    queue = JobQueue(args.jobs)
+
+    if args.command == "ingest":
+        if not collection_name_ok(args.collection):
+            parser.error("collection names may only contain letters, digits, '-' and '_'")
+        missing = [path for path in args.paths if not os.path.exists(path)]
+        if missing:
+            parser.error(f"not found: {', '.join(missing)}")
+        paths = [os.path.abspath(path) for path in args.paths]
+        print(f"Queued job {submit_ingest(queue, args.collection, paths, shared=True)} ({len(pdf_files(paths))} PDFs)")
+    elif args.command == "summarize":
+        videos = list(args.videos)
+        if args.file:
+            with open(args.file, encoding="utf-8") as f:
+                videos += [line for line in f.read().splitlines() if line.strip() and not line.startswith("#")]
+        if not videos:
+            parser.error("no videos given")
+        for video in videos:
+            video_id = video_id_from_url(video)
+            print(f"Queued job {submit_summary(queue, video_id, args.subject)} ({video_id})")
+    elif args.command == "work":
+        configure_genai()
+        Worker(queue, JobHandlers(), workers=args.workers, idle_exit=args.exit_when_idle).run()
+    elif args.command == "status":
+        if args.job_id is None:
+            print(queue.stats())
+            print_jobs(queue.recent())
+        elif args.retry:
+            queue.retry(args.job_id)
+            print_jobs([queue.get(args.job_id)])
+        else:
+            job = queue.get(args.job_id)
+            print_jobs([job] if job else [])
+
+
+if __name__ == "__main__":
+    main()